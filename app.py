@@ -1,11 +1,29 @@
+import csv
+import io
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from datetime import datetime, timezone
+from itertools import chain
+from flask import Flask, Response, jsonify, render_template, stream_template, request, redirect, url_for, session, flash
+from flask.json.provider import DefaultJSONProvider
 import database
 import coresystem
 import config
+import credentials
+import records
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Serialises table records as plain objects in API responses."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, records.Record):
+            return o.to_row()
+        return DefaultJSONProvider.default(o)
+
 
 app = Flask(__name__)
 app.secret_key = "secure_key_shrdaa_demo"
+app.json = RecordJSONProvider(app)
 
 # Initialize Database files on startup
 database.init_all()
@@ -25,6 +43,10 @@ def login_required(func):
     wrapper.__name__ = func.__name__
     return wrapper
 
+def reauthorized(user, password):
+    """Password re-check before a transfer, cached per login session."""
+    return credentials.reauthorize(session.get('sid'), user['account_no'], password)
+
 # --- Routes ---
 
 @app.route('/')
@@ -38,7 +60,8 @@ def public_access():
     """Public Access Mode - View Ledger without login."""
     user = get_current_user()
     all_projects = coresystem.get_all_projects()
-    return render_template('public.html', user=user, projects=all_projects)
+    project_stats = coresystem.get_project_stats()
+    return render_template('public.html', user=user, projects=all_projects, project_stats=project_stats)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login_page():
@@ -46,9 +69,11 @@ def login_page():
     if request.method == 'POST':
         account_no = request.form.get('account_no')
         password = request.form.get('password')
-        user = coresystem._get_account(account_no)
-        
-        if user and user['password_hash'] == coresystem._sha256(password):
+        user = credentials.authenticate(account_no, password)
+
+        if user:
+            credentials.forget_session(session.get('sid'))
+            session['sid'] = credentials.new_session_id()
             session['account_no'] = user['account_no']
             session['role'] = coresystem.resolve_user_role(user['rank'])
             flash(f"Welcome back, {user['name']}", "success")
@@ -69,10 +94,13 @@ def dashboard():
     my_project_ids = coresystem.get_user_projects(user['account_no'])
     my_projects = [p for p in all_projects if p['project_no'] in my_project_ids]
 
-    return render_template('dashboard.html', user=user, role=role, projects=all_projects, my_projects=my_projects)
+    project_stats = coresystem.get_project_stats()
+
+    return render_template('dashboard.html', user=user, role=role, projects=all_projects, my_projects=my_projects, project_stats=project_stats)
 
 @app.route('/logout')
 def logout():
+    credentials.forget_session(session.get('sid'))
     session.clear()
     flash("Logged out successfully.", "info")
     return redirect(url_for('home'))
@@ -80,8 +108,34 @@ def logout():
 # --- Action Routes ---
 @app.route('/ledger/<project_no>')
 def view_ledger(project_no):
-    transactions = coresystem.get_ledger_by_project(project_no)
-    return render_template('partials_transactions.html', transactions=transactions, project_no=project_no)
+    """
+    One page of a project's ledger, keyed by the transaction_no cursor in
+    ?after=. With ?stream=1 every remaining row is streamed instead.
+    """
+    after = request.args.get('after') or None
+
+    if request.args.get('stream'):
+        rows = coresystem.iter_ledger_by_project(project_no, after)
+        first = next(rows, None)
+        transactions = chain([first], rows) if first else []
+        return Response(stream_template(
+            'partials_transactions.html',
+            transactions=transactions,
+            project_no=project_no,
+            next_cursor=None,
+            continuation=after is not None,
+        ))
+
+    limit = request.args.get('limit', config.LEDGER_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, config.LEDGER_PAGE_SIZE_MAX))
+    transactions, next_cursor = coresystem.get_ledger_page(project_no, after, limit)
+    return render_template(
+        'partials_transactions.html',
+        transactions=transactions,
+        project_no=project_no,
+        next_cursor=next_cursor,
+        continuation=after is not None,
+    )
 
 @app.route('/action/create_user', methods=['POST'])
 @login_required
@@ -123,7 +177,7 @@ def make_transaction():
         # Re-verify password for security (as per original CLI requirement)
         password = request.form.get('password')
         user = get_current_user()
-        if user['password_hash'] != coresystem._sha256(password):
+        if not reauthorized(user, password):
             flash("Transaction Failed: Incorrect Password", "danger")
             return redirect(url_for('dashboard'))
 
@@ -131,13 +185,46 @@ def make_transaction():
             from_account_no=user['account_no'],
             to_account_no=request.form.get('to_account'),
             project_no=request.form.get('project_no'),
-            amount=float(request.form.get('amount'))
+            amount=request.form.get('amount')
         )
         flash("Transaction Successful!", "success")
     except Exception as e:
         flash(f"Transaction Failed: {str(e)}", "danger")
     return redirect(url_for('dashboard'))
 
+@app.route('/action/transactions/bulk', methods=['POST'])
+@login_required
+def make_transactions_bulk():
+    try:
+        password = request.form.get('password')
+        user = get_current_user()
+        if not reauthorized(user, password):
+            flash("Bulk Transfer Failed: Incorrect Password", "danger")
+            return redirect(url_for('dashboard'))
+
+        upload = request.files.get('batch_file')
+        if upload is None or not upload.filename:
+            flash("Bulk Transfer Failed: No file uploaded", "danger")
+            return redirect(url_for('dashboard'))
+
+        # CSV columns: to_account_no, project_no, amount
+        reader = csv.DictReader(io.StringIO(upload.read().decode('utf-8-sig')))
+        batch = [dict(row, from_account_no=user['account_no']) for row in reader]
+
+        results = coresystem.process_transactions(batch)
+        done = [r['transaction_no'] for r in results if r['ok']]
+        failed = [f"row {r['row'] + 1}: {r['error']}" for r in results if not r['ok']]
+
+        if not results:
+            flash("Bulk Transfer: file has no rows.", "info")
+        elif failed:
+            flash(f"Processed {len(done)} of {len(results)} transfers. Rejected {'; '.join(failed)}", "warning")
+        else:
+            flash(f"Processed {len(done)} transfers ({done[0]} to {done[-1]}).", "success")
+    except Exception as e:
+        flash(f"Bulk Transfer Failed: {str(e)}", "danger")
+    return redirect(url_for('dashboard'))
+
 @app.route('/action/verify', methods=['POST'])
 @login_required
 def verify_transaction():
@@ -152,6 +239,213 @@ def verify_transaction():
         flash(f"Error: {str(e)}", "danger")
     return redirect(url_for('dashboard'))
 
+@app.route('/action/verify_batch', methods=['POST'])
+@login_required
+def verify_transactions_batch():
+    try:
+        scope = request.form.get('scope')
+        if scope == 'project':
+            selection = request.form.get('project_no', '').strip()
+        elif scope == 'list':
+            txn_input = request.form.get('transaction_nos', '')
+            selection = [t.strip() for t in txn_input.split(",") if t.strip()]
+        else:
+            selection = coresystem.ALL_PENDING
+
+        results = coresystem.verify_transactions(selection)
+        verified = [t for t, r in results.items() if r == coresystem.VERIFY_OK]
+        failed = [t for t, r in results.items() if r == coresystem.VERIFY_FAILED]
+        skipped = len(results) - len(verified) - len(failed)
+
+        if not results:
+            flash("No transactions to verify.", "info")
+        elif failed:
+            flash(f"Verified {len(verified)}, FAILED {len(failed)}: {', '.join(failed)} ({skipped} skipped).", "danger")
+        else:
+            flash(f"Verified {len(verified)} transactions ({skipped} skipped).", "success")
+    except Exception as e:
+        flash(f"Error: {str(e)}", "danger")
+    return redirect(url_for('dashboard'))
+
+
+@app.route('/api/v1/transactions', methods=['POST'])
+def api_create_transactions():
+    """
+    Bulk transfers from the logged-in account. Body:
+    {"password": ..., "transactions": [{to_account_no, project_no, amount}, ...]}
+    Returns one result per row; valid rows are committed even if others fail.
+    """
+    user = get_current_user()
+    if user is None:
+        return jsonify({"error": "Login required"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    if not reauthorized(user, payload.get('password')):
+        return jsonify({"error": "Incorrect password"}), 403
+
+    transactions = payload.get('transactions')
+    if not isinstance(transactions, list) or not all(isinstance(t, dict) for t in transactions):
+        return jsonify({"error": "transactions must be a list of objects"}), 400
+
+    batch = [dict(t, from_account_no=user['account_no']) for t in transactions]
+    try:
+        results = coresystem.process_transactions(batch)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        app.logger.exception("Bulk transaction request failed")
+        return jsonify({"error": "Transactions could not be processed"}), 500
+    accepted = sum(1 for r in results if r['ok'])
+    return jsonify({
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }), 200
+
+
+# --- JSON API (read-only) ---
+
+def api_response(build):
+    """
+    JSON response with ETag / Last-Modified validators taken from the
+    data version. Conditional requests that still match get 304 without
+    the body ever being built.
+    """
+    etag = database.data_version()
+    modified = database.last_modified()
+    last_modified = datetime.fromtimestamp(int(modified), timezone.utc) if modified else None
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(
+            last_modified
+            and request.if_modified_since
+            and request.if_modified_since >= last_modified
+        )
+
+    if not_modified:
+        response = Response(status=304)
+    else:
+        body, status = build()
+        response = jsonify(body)
+        response.status_code = status
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/v1/projects')
+def api_projects():
+    return api_response(lambda: ({"projects": coresystem.get_all_projects()}, 200))
+
+
+@app.route('/api/v1/projects/<project_no>/ledger')
+def api_project_ledger(project_no):
+    after = request.args.get('after') or None
+    limit = request.args.get('limit', config.LEDGER_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, config.LEDGER_PAGE_SIZE_MAX))
+
+    def build():
+        transactions, next_cursor = coresystem.get_ledger_page(project_no, after, limit)
+        return {
+            "project_no": project_no,
+            "transactions": transactions,
+            "next_cursor": next_cursor,
+        }, 200
+
+    return api_response(build)
+
+
+@app.route('/api/v1/transactions/<transaction_no>')
+def api_transaction(transaction_no):
+    def build():
+        found = coresystem.get_transaction(transaction_no)
+        if found is None:
+            return {"error": "Transaction not found"}, 404
+        return found, 200
+
+    return api_response(build)
+
+
+@app.route('/api/v1/accounts/<account_no>/balance')
+def api_account_balance(account_no):
+    """
+    Balance of an account, as of ?at=<timestamp|transaction_no> if given.
+    With ?history=1 the running balance after each transaction is included.
+    Visible to the account itself, Govt officers and Auditors.
+    """
+    user = get_current_user()
+    if user is None:
+        return jsonify({"error": "Login required"}), 401
+    if user['account_no'] != account_no and session.get('role') not in (config.ROLE_GOVT_OFFICER, config.ROLE_AUDITOR):
+        return jsonify({"error": "Not permitted"}), 403
+
+    at = request.args.get('at') or None
+
+    def build():
+        account = coresystem.get_account_info(account_no)
+        if account is None:
+            return {"error": "Account not found"}, 404
+        try:
+            balance = coresystem.balance_at(account_no, at) if at else account['balance']
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        body = {"account_no": account_no, "at": at, "balance": balance}
+        if request.args.get('history'):
+            body["history"] = coresystem.get_balance_history(account_no)
+        return body, 200
+
+    return api_response(build)
+
+
+@app.route('/api/v1/chain/tip')
+def api_chain_tip():
+    return api_response(lambda: ({"tip": coresystem.get_chain_tip()}, 200))
+
+
+@app.route('/api/v1/transactions/<transaction_no>/proof')
+def api_transaction_proof(transaction_no):
+    """
+    Merkle inclusion proof for one transaction (see verify endpoint).
+    ?size= proves against the global tree at that many leaves, to match
+    a root published earlier.
+    """
+    size = request.args.get('size', type=int)
+
+    def build():
+        try:
+            proof = coresystem.get_inclusion_proof(transaction_no, size)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if proof is None:
+            return {"error": "Transaction not found"}, 404
+        return proof, 200
+
+    return api_response(build)
+
+
+@app.route('/api/v1/merkle/roots')
+def api_merkle_roots():
+    return api_response(lambda: (coresystem.get_merkle_roots(), 200))
+
+
+@app.route('/api/v1/proofs/verify', methods=['POST'])
+def api_verify_proof():
+    """
+    Body: {"proof": <proof>, "trusted_root": optional global root}.
+    Proofs can equally be checked offline with merkle.verify_inclusion.
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload.get('proof'), dict):
+        return jsonify({"error": "proof must be an object"}), 400
+    valid = coresystem.verify_inclusion_proof(payload['proof'], payload.get('trusted_root'))
+    return jsonify({"valid": valid}), 200
+
 
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,659 @@
+# audit.py
+# Full-chain integrity auditing for SHRDAA
+
+import hashlib
+import hmac
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice, zip_longest
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+import coresystem
+import database
+import money
+import writer
+
+
+GENESIS_HASH = "GENESIS"
+
+
+# ---------- Checkpoints ----------
+
+def _sign_checkpoint(height: str, transaction_no: str, current_hash: str, created_at: str) -> str:
+    message = f"{height}|{transaction_no}|{current_hash}|{created_at}"
+    return hmac.new(
+        config.AUDIT_CHECKPOINT_KEY.encode("utf-8"),
+        message.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _checkpoint_is_valid(checkpoint: Dict[str, str]) -> bool:
+    expected = _sign_checkpoint(
+        checkpoint["height"],
+        checkpoint["transaction_no"],
+        checkpoint["current_hash"],
+        checkpoint["created_at"],
+    )
+    return hmac.compare_digest(expected, checkpoint["signature"])
+
+
+@writer.serialized
+def _save_checkpoint(height: int, transaction_no: str, current_hash: str) -> Dict[str, str]:
+    created_at = coresystem._current_timestamp()
+    checkpoint = {
+        "height": str(height),
+        "transaction_no": transaction_no,
+        "current_hash": current_hash,
+        "created_at": created_at,
+        "signature": _sign_checkpoint(str(height), transaction_no, current_hash, created_at),
+    }
+    database.append_chain_checkpoint(checkpoint)
+    return checkpoint
+
+
+# ---------- Block Checks ----------
+
+def check_block(
+    tx: Optional[Dict[str, str]],
+    block: Optional[Dict[str, str]],
+    expected_previous: str,
+) -> Optional[str]:
+    """
+    Returns the reason a ledger row / block pair breaks the chain,
+    or None if the block is intact and links to expected_previous.
+    """
+    if block is None:
+        return "missing block"
+    if tx is None:
+        return "missing ledger row"
+    if tx["transaction_no"] != block["transaction_no"]:
+        return "ledger and chain out of order"
+    if block["previous_hash"] != expected_previous:
+        return "broken link to previous block"
+    if coresystem.compute_block_hash(tx, block["previous_hash"]) != block["current_hash"]:
+        return "hash mismatch"
+    return None
+
+
+# ---------- Chain Verification ----------
+
+def _resume_point(full: bool) -> Tuple[Optional[Dict[str, str]], bool]:
+    """
+    Returns the last valid checkpoint to resume from (None to start at
+    genesis) and whether a checkpoint was rejected for a bad signature.
+    """
+    if full:
+        return None, False
+    checkpoint = database.get_last_chain_checkpoint()
+    if checkpoint is None:
+        return None, False
+    if not _checkpoint_is_valid(checkpoint):
+        return None, True
+    return checkpoint, False
+
+
+def _rows_with_blocks(firsts, ends, pending_after: Optional[int]):
+    """
+    Ledger rows that have a per-transaction block: not inside a sealed
+    block's range and, while sealing is on, not after the chain tip.
+    """
+    for tx in database.iter_ledger():
+        number = database.transaction_number(tx["transaction_no"])
+        if pending_after is not None and number > pending_after:
+            continue
+        i = bisect_left(ends, number)
+        if i < len(ends) and firsts[i] <= number:
+            continue
+        yield tx
+
+
+def _open_pairs(anchor: Optional[Dict[str, str]]):
+    """
+    Streams (ledger row, block) pairs after the anchor. The checkpointed
+    block itself is re-read first to confirm it is unchanged; returns the
+    pair iterator and the break found there, if any.
+    """
+    start_height = int(anchor["height"]) if anchor else 0
+    skip = max(start_height - 1, 0)
+
+    seals, firsts, ends = database.get_seal_ranges()
+    pending_after = None
+    if config.BLOCK_SEALING:
+        # New rows wait for a seal instead of getting a block.
+        tip = database.get_chain_tip()
+        pending_after = database.transaction_number(tip["transaction_no"]) if tip else -1
+
+    if seals or pending_after is not None:
+        # Sealed and pending transactions have no block of their own (see
+        # verify_seals), so ledger positions no longer match heights:
+        # skip by count.
+        ledger = islice(_rows_with_blocks(firsts, ends, pending_after), skip, None)
+    else:
+        ledger = database.iter_ledger(skip)
+    pairs = zip_longest(ledger, database.iter_blockchain(skip))
+
+    if anchor is None:
+        return pairs, None
+
+    _, block = next(pairs, (None, None))
+    if (
+        block is None
+        or block["transaction_no"] != anchor["transaction_no"]
+        or block["current_hash"] != anchor["current_hash"]
+    ):
+        return pairs, {
+            "height": start_height,
+            "transaction_no": anchor["transaction_no"],
+            "reason": "checkpointed block changed",
+        }
+    return pairs, None
+
+
+def _report(
+    started: float,
+    anchor: Optional[Dict[str, str]],
+    checkpoint_rejected: bool,
+    height: int,
+    checked: int,
+    breaks: int,
+    first_break: Optional[Dict[str, object]],
+    intact_block: Optional[Tuple[int, str, str]],
+    progress: Optional[Callable[[int, int, float], None]],
+) -> Dict[str, object]:
+    """
+    Saves the intact prefix as a new checkpoint and builds the audit report.
+    intact_block is (height, transaction_no, current_hash) of the last
+    block before the first break.
+    """
+    start_height = int(anchor["height"]) if anchor else 0
+    intact_height = height if first_break is None else first_break["height"] - 1
+
+    new_checkpoint = None
+    if intact_block is not None and intact_block[0] == intact_height > start_height:
+        new_checkpoint = _save_checkpoint(*intact_block)
+
+    elapsed = time.perf_counter() - started
+    if progress:
+        progress(checked, height, elapsed)
+
+    return {
+        "ok": first_break is None,
+        "start_height": start_height,
+        "height": height,
+        "intact_height": intact_height,
+        "checked": checked,
+        "breaks": breaks,
+        "first_break": first_break,
+        "checkpoint_rejected": checkpoint_rejected,
+        "checkpoint": new_checkpoint,
+        "elapsed": elapsed,
+        "blocks_per_sec": checked / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def verify_chain(
+    full: bool = False,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Dict[str, object]:
+    """
+    Streams ledger and blockchain in lockstep, checking every block's hash
+    and its link to the previous block.
+
+    Unless full=True, resumes from the last signed checkpoint and only
+    checks blocks added since. The intact prefix of the chain is saved
+    as a new signed checkpoint.
+    progress(checked, height, elapsed) is called every
+    config.AUDIT_PROGRESS_EVERY blocks.
+    """
+    started = time.perf_counter()
+    anchor, checkpoint_rejected = _resume_point(full)
+    pairs, first_break = _open_pairs(anchor)
+
+    height = int(anchor["height"]) if anchor else 0
+    expected_previous = anchor["current_hash"] if anchor else GENESIS_HASH
+    checked = 0
+    breaks = 1 if first_break else 0
+    intact_block = None
+
+    # Keep walking after a break so one audit reports the whole damage;
+    # only the intact prefix is checkpointed.
+    for tx, block in pairs:
+        height += 1
+        checked += 1
+
+        reason = check_block(tx, block, expected_previous)
+        if reason:
+            breaks += 1
+            if first_break is None:
+                first_break = {
+                    "height": height,
+                    "transaction_no": (tx or block)["transaction_no"],
+                    "reason": reason,
+                }
+        elif first_break is None:
+            intact_block = (height, block["transaction_no"], block["current_hash"])
+
+        if block is not None:
+            expected_previous = block["current_hash"]
+
+        if progress and checked % config.AUDIT_PROGRESS_EVERY == 0:
+            progress(checked, height, time.perf_counter() - started)
+
+    return _report(
+        started, anchor, checkpoint_rejected, height, checked,
+        breaks, first_break, intact_block, progress,
+    )
+
+
+# ---------- Parallel Verification ----------
+
+_TX_FIELDS = (
+    "transaction_no",
+    "project_no",
+    "from_account_no",
+    "to_account_no",
+    "amount",
+    "timestamp",
+)
+_BLOCK_FIELDS = ("transaction_no", "previous_hash", "current_hash")
+
+
+def _pack(row: Optional[Dict[str, str]], fields: Tuple[str, ...]) -> Optional[tuple]:
+    return None if row is None else tuple(row[f] for f in fields)
+
+
+def _check_segment(start_height: int, pairs: List[tuple]) -> Dict[str, object]:
+    """
+    Worker: checks hashes and internal links of one chain segment.
+    The link into the segment's first block is checked by the caller.
+    """
+    first_previous = None
+    first_transaction_no = None
+    expected_previous = None
+    first_break = None
+    breaks = 0
+    last_block = None
+    intact_block = None
+
+    for offset, (packed_tx, packed_block) in enumerate(pairs):
+        height = start_height + offset + 1
+        tx = dict(zip(_TX_FIELDS, packed_tx)) if packed_tx else None
+        block = dict(zip(_BLOCK_FIELDS, packed_block)) if packed_block else None
+
+        if offset == 0:
+            first_transaction_no = (tx or block)["transaction_no"]
+            if block is not None:
+                first_previous = expected_previous = block["previous_hash"]
+
+        reason = check_block(tx, block, expected_previous)
+        if reason:
+            breaks += 1
+            if first_break is None:
+                first_break = {
+                    "height": height,
+                    "transaction_no": (tx or block)["transaction_no"],
+                    "reason": reason,
+                }
+
+        if block is not None:
+            expected_previous = block["current_hash"]
+            last_block = (height, block["transaction_no"], block["current_hash"])
+            if first_break is None:
+                intact_block = last_block
+
+    return {
+        "start_height": start_height,
+        "end_height": start_height + len(pairs),
+        "first_previous": first_previous,
+        "first_transaction_no": first_transaction_no,
+        "last_hash": expected_previous,
+        "first_break": first_break,
+        "breaks": breaks,
+        "intact_block": intact_block,
+    }
+
+
+def _segments(pairs, segment_size: int):
+    segment = []
+    for tx, block in pairs:
+        segment.append((_pack(tx, _TX_FIELDS), _pack(block, _BLOCK_FIELDS)))
+        if len(segment) == segment_size:
+            yield segment
+            segment = []
+    if segment:
+        yield segment
+
+
+def verify_chain_parallel(
+    workers: Optional[int] = None,
+    segment_size: Optional[int] = None,
+    full: bool = False,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Dict[str, object]:
+    """
+    Same checks and report as verify_chain(), with hashing spread over a
+    process pool. The chain is cut into segments; each worker checks its
+    segment's hashes and internal links, and segments are stitched by
+    comparing each boundary hash. The report adds a "segments" list with
+    the first break found in each segment.
+    """
+    workers = workers or config.AUDIT_WORKERS
+    segment_size = segment_size or config.AUDIT_SEGMENT_SIZE
+
+    started = time.perf_counter()
+    anchor, checkpoint_rejected = _resume_point(full)
+    pairs, anchor_break = _open_pairs(anchor)
+
+    start_height = int(anchor["height"]) if anchor else 0
+    height = start_height
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for segment in _segments(pairs, segment_size):
+            pending.append(pool.submit(_check_segment, height, segment))
+            height += len(segment)
+
+            # Bound the number of segments held in memory at once.
+            while len(pending) >= workers * 2:
+                results.append(pending.popleft().result())
+                if progress:
+                    done = results[-1]["end_height"]
+                    progress(done - start_height, done, time.perf_counter() - started)
+        results.extend(future.result() for future in pending)
+
+    # Stitch: each segment must link to the hash the previous one ended on.
+    expected_previous = anchor["current_hash"] if anchor else GENESIS_HASH
+    first_break = anchor_break
+    breaks = 1 if anchor_break else 0
+    intact_block = None
+    segments = []
+
+    for result in results:
+        seg_break = result["first_break"]
+        seg_breaks = result["breaks"]
+        boundary = result["start_height"] + 1
+
+        if result["first_previous"] is not None and result["first_previous"] != expected_previous:
+            # A bad first block was already counted by the worker.
+            if seg_break is None or seg_break["height"] != boundary:
+                seg_breaks += 1
+            seg_break = {
+                "height": boundary,
+                "transaction_no": result["first_transaction_no"],
+                "reason": "broken link to previous block",
+            }
+
+        segments.append({
+            "start_height": boundary,
+            "end_height": result["end_height"],
+            "first_break": seg_break,
+            "breaks": seg_breaks,
+        })
+
+        breaks += seg_breaks
+        if first_break is None:
+            if seg_break is None:
+                intact_block = result["intact_block"] or intact_block
+            else:
+                first_break = seg_break
+                if seg_break["height"] > boundary:
+                    intact_block = result["intact_block"]
+
+        if result["last_hash"] is not None:
+            expected_previous = result["last_hash"]
+
+    report = _report(
+        started, anchor, checkpoint_rejected, height, height - start_height,
+        breaks, first_break, intact_block, progress,
+    )
+    report["workers"] = workers
+    report["segments"] = segments
+    return report
+
+
+# ---------- Balance Reconciliation ----------
+
+RECONCILE_REPORT_HEADERS = [
+    "account_no",
+    "reason",
+    "opening",
+    "net_flow",
+    "expected",
+    "actual",
+    "difference",
+]
+
+# Accounts whose opening balance was derived on upgrade (see
+# database._backfill_opening_balances), with the default balance for
+# their rank as the closest thing to a recorded one.
+RECONCILE_DERIVED_HEADERS = [
+    "account_no",
+    "opening",
+    "rank_default",
+    "difference",
+]
+
+
+@writer.serialized
+def _reconcile_snapshot() -> Tuple[Dict[str, int], Dict[str, str], Optional[str]]:
+    """
+    Balances, opening balances and the last ledger transaction, taken
+    together between writes so they describe one state.
+    """
+    balances = {row.account_no: row.balance_paise for row in database.read_accounts()}
+    last = database.get_last_ledger_row()
+    return balances, database.read_opening_balances(), last["transaction_no"] if last else None
+
+
+def _derived_openings(openings: Dict[str, str]) -> List[Dict[str, str]]:
+    """Rows of RECONCILE_DERIVED_HEADERS, one per derived opening balance."""
+    derived = database.read_derived_openings()
+    rows = []
+    for account in database.read_accounts():
+        opening = openings.get(account.account_no)
+        if account.account_no not in derived or opening is None:
+            continue
+        default = coresystem.default_balance(account.rank)
+        rows.append({
+            "account_no": account.account_no,
+            "opening": money.canonical(opening),
+            "rank_default": default,
+            "difference": money.format_paise(money.to_paise(opening) - money.to_paise(default)),
+        })
+    return sorted(rows, key=lambda row: row["account_no"])
+
+
+def _net_flows(
+    last_transaction_no: Optional[str],
+    started: float,
+    progress: Optional[Callable[[int, float], None]],
+) -> Tuple[Dict[str, int], int]:
+    """
+    Net paise moved into each account by the ledger, up to and including
+    last_transaction_no. Streams the ledger once; memory grows with the
+    number of accounts, not rows.
+    """
+    net = defaultdict(int)
+    to_paise = lru_cache(maxsize=65_536)(money.to_paise)
+    rows = 0
+
+    if last_transaction_no is None:
+        return net, rows
+
+    for tx in database.iter_ledger():
+        amount = to_paise(tx["amount"])
+        net[tx["from_account_no"]] -= amount
+        net[tx["to_account_no"]] += amount
+        rows += 1
+
+        if progress and rows % config.AUDIT_PROGRESS_EVERY == 0:
+            progress(rows, time.perf_counter() - started)
+        # Rows appended after the snapshot belong to a later state.
+        if tx["transaction_no"] == last_transaction_no:
+            break
+    return net, rows
+
+
+def reconcile_balances(
+    progress: Optional[Callable[[int, float], None]] = None,
+) -> Dict[str, object]:
+    """
+    Checks every account balance against opening balance + net ledger
+    flow, in one pass over the ledger.
+
+    Each mismatch is reported as a row of RECONCILE_REPORT_HEADERS with
+    reason "balance mismatch", "no opening balance" (account missing from
+    opening_balances) or "unknown account" (in the ledger only).
+    Opening balances derived on upgrade reconcile by construction, so
+    they are listed under "derived_openings" against the rank default.
+    progress(rows, elapsed) is called every config.AUDIT_PROGRESS_EVERY
+    ledger rows.
+    """
+    started = time.perf_counter()
+    balances, openings, last_transaction_no = _reconcile_snapshot()
+    net, rows = _net_flows(last_transaction_no, started, progress)
+
+    mismatches = []
+    for account_no in sorted(balances.keys() | net.keys()):
+        flow = net.get(account_no, 0)
+        actual = balances.get(account_no)
+        opening = openings.get(account_no)
+
+        if actual is None:
+            reason = "unknown account"
+        elif opening is None:
+            reason = "no opening balance"
+        elif money.to_paise(opening) + flow != actual:
+            reason = "balance mismatch"
+        else:
+            continue
+
+        expected = money.to_paise(opening) + flow if opening is not None else None
+        mismatches.append({
+            "account_no": account_no,
+            "reason": reason,
+            "opening": money.canonical(opening) if opening is not None else "",
+            "net_flow": money.format_paise(flow),
+            "expected": money.format_paise(expected) if expected is not None else "",
+            "actual": money.format_paise(actual) if actual is not None else "",
+            "difference": (
+                money.format_paise(actual - expected)
+                if actual is not None and expected is not None else ""
+            ),
+        })
+
+    elapsed = time.perf_counter() - started
+    if progress:
+        progress(rows, elapsed)
+
+    return {
+        "ok": not mismatches,
+        "accounts": len(balances),
+        "ledger_rows": rows,
+        "last_transaction_no": last_transaction_no,
+        "mismatches": mismatches,
+        "derived_openings": _derived_openings(openings),
+        "elapsed": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+# ---------- Sealed Block Verification ----------
+
+def _seal_anchor(seals: List[Dict[str, str]]) -> str:
+    """
+    Hash the first sealed block must link to: the per-transaction block
+    of the last transaction before it, or GENESIS.
+    """
+    first = database.transaction_number(seals[0]["first_transaction_no"])
+    previous = None
+    for tx in database.iter_ledger():
+        if database.transaction_number(tx["transaction_no"]) >= first:
+            break
+        previous = tx
+    block = database.get_block(previous["transaction_no"]) if previous else None
+    return block["current_hash"] if block else GENESIS_HASH
+
+
+def verify_seals(
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Dict[str, object]:
+    """
+    Checks every sealed block in one pass over the ledger: transaction
+    count, Merkle root over its ledger rows, its own hash, and its link
+    to the previous sealed block. Keeps going after a break so the report
+    covers the whole damage. Transactions still waiting for a seal are
+    counted as "unsealed", not as breaks.
+    progress(checked, seals, elapsed) is called every
+    config.AUDIT_PROGRESS_EVERY seals.
+    """
+    started = time.perf_counter()
+    seals = database.read_sealed_blocks()
+    breaks = 0
+    first_break = None
+    transactions = 0
+
+    def check(i: int, members: List[Dict[str, str]], expected_previous: str) -> None:
+        nonlocal breaks, first_break
+
+        seal = seals[i]
+        reason = coresystem.seal_is_intact(seal, members)
+        if reason is None and seal["previous_hash"] != expected_previous:
+            reason = "broken link to previous block"
+        if reason:
+            breaks += 1
+            if first_break is None:
+                first_break = {"height": i + 1, "seal_no": seal["seal_no"], "reason": reason}
+        if progress and (i + 1) % config.AUDIT_PROGRESS_EVERY == 0:
+            progress(i + 1, len(seals), time.perf_counter() - started)
+
+    if seals:
+        expected_previous = _seal_anchor(seals)
+        i = 0
+        members = []
+        low = database.transaction_number(seals[0]["first_transaction_no"])
+        high = database.transaction_number(seals[0]["last_transaction_no"])
+
+        for tx in database.iter_ledger():
+            number = database.transaction_number(tx["transaction_no"])
+            while i < len(seals) and number > high:
+                check(i, members, expected_previous)
+                expected_previous = seals[i]["current_hash"]
+                transactions += len(members)
+                i += 1
+                members = []
+                if i < len(seals):
+                    low = database.transaction_number(seals[i]["first_transaction_no"])
+                    high = database.transaction_number(seals[i]["last_transaction_no"])
+            if i == len(seals):
+                break
+            if low <= number:
+                members.append(tx)
+
+        # Seals past the end of the ledger (rows missing or truncated).
+        while i < len(seals):
+            check(i, members, expected_previous)
+            expected_previous = seals[i]["current_hash"]
+            transactions += len(members)
+            i += 1
+            members = []
+
+    elapsed = time.perf_counter() - started
+    if progress:
+        progress(len(seals), len(seals), elapsed)
+
+    return {
+        "ok": first_break is None,
+        "seals": len(seals),
+        "transactions": transactions,
+        "unsealed": len(coresystem.get_unsealed_rows()) if config.BLOCK_SEALING else 0,
+        "breaks": breaks,
+        "first_break": first_break,
+        "elapsed": elapsed,
+    }
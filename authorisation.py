@@ -1,29 +1,22 @@
 # authorisation.py
 # Authentication and authorization handling for SHRDAA
 
-import hashlib
 from typing import Optional
 
 import database
-import coresystem
+import credentials
 
 
 # ---------- Session State (Single User Demo) ----------
 
 _active_account_no: Optional[str] = None
+_session_id: Optional[str] = None
 
 
 # ---------- Internal Helpers ----------
 
-def _sha256(data: str) -> str:
-    return hashlib.sha256(data.encode("utf-8")).hexdigest()
-
-
 def _get_account(account_no: str):
-    for acc in database.read_accounts():
-        if acc["account_no"] == account_no:
-            return acc
-    return None
+    return database.get_account(account_no)
 
 
 # ---------- Login / Logout ----------
@@ -33,24 +26,25 @@ def login(account_no: str, password: str) -> bool:
     Validates credentials.
     On success, overrides any existing session.
     """
-    global _active_account_no
+    global _active_account_no, _session_id
 
-    acc = _get_account(account_no)
-    if not acc:
-        _active_account_no = None
-        return False
+    credentials.forget_session(_session_id)
+    _session_id = None
 
-    if _sha256(password) != acc["password_hash"]:
+    if credentials.authenticate(account_no, password) is None:
         _active_account_no = None
         return False
 
     _active_account_no = account_no
+    _session_id = credentials.new_session_id()
     return True
 
 
 def logout() -> None:
-    global _active_account_no
+    global _active_account_no, _session_id
+    credentials.forget_session(_session_id)
     _active_account_no = None
+    _session_id = None
 
 
 def is_logged_in() -> bool:
@@ -71,11 +65,7 @@ def authorize_transaction(password: str) -> bool:
     if not is_logged_in():
         return False
 
-    acc = _get_account(_active_account_no)
-    if not acc:
-        return False
-
-    return _sha256(password) == acc["password_hash"]
+    return credentials.reauthorize(_session_id, _active_account_no, password)
 
 
 # ---------- Role Access Helpers ----------
@@ -87,11 +77,8 @@ def current_user_role() -> Optional[str]:
     if not is_logged_in():
         return None
 
-    acc = _get_account(_active_account_no)
-    if not acc:
-        return None
-
-    return coresystem.resolve_user_role(acc["rank"])
+    perms = database.get_account_permissions(_active_account_no)
+    return perms.role if perms else None
 
 
 def current_user_info():
@@ -0,0 +1,220 @@
+# chainfile.py
+# Fixed-width binary mirror of the blockchain table for SHRDAA
+
+import csv
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional
+
+import records
+import storage
+
+
+GENESIS_HASH = "GENESIS"
+
+# File header: magic, format version, record size, then the backend stamp
+# (generation, version, end_position) of the table state mirrored and the
+# number of blocks. Records past `count` are an interrupted append and
+# are ignored.
+HEADER = struct.Struct("<8sHH4xQQQQ")
+MAGIC = b"SHRDAACH"
+VERSION = 1
+
+# One block: transaction_no, project_no (NUL-padded ASCII), then the
+# previous and current hashes as 32 raw bytes each (GENESIS = all zeros).
+RECORD = struct.Struct("<16s16s32s32s")
+_ZERO_HASH = bytes(32)
+
+
+# ---------- Encoding ----------
+
+def _encode_id(value: str) -> bytes:
+    raw = value.encode("ascii")
+    if len(raw) > 16:
+        raise ValueError(f"ID too long for chain file: {value!r}")
+    return raw
+
+
+def _encode_hash(value: str) -> bytes:
+    if value == GENESIS_HASH:
+        return _ZERO_HASH
+    raw = bytes.fromhex(value)
+    if len(raw) != 32:
+        raise ValueError(f"Not a sha256 hash: {value!r}")
+    return raw
+
+
+def _decode_hash(raw: bytes) -> str:
+    return GENESIS_HASH if raw == _ZERO_HASH else raw.hex()
+
+
+def encode_block(block: Dict[str, str]) -> bytes:
+    return RECORD.pack(
+        _encode_id(block["transaction_no"]),
+        _encode_id(block["project_no"]),
+        _encode_hash(block["previous_hash"]),
+        _encode_hash(block["current_hash"]),
+    )
+
+
+def _decode(fields) -> records.Block:
+    transaction_no, project_no, previous_hash, current_hash = fields
+    return records.Block.from_values([
+        transaction_no.rstrip(b"\0").decode("ascii"),
+        project_no.rstrip(b"\0").decode("ascii"),
+        _decode_hash(previous_hash),
+        _decode_hash(current_hash),
+    ])
+
+
+# ---------- Chain File ----------
+
+class ChainFile:
+    """
+    Binary copy of the blockchain table, kept in step with the backend
+    stamp and read through mmap: block N is one struct unpack at a fixed
+    offset, and scans unpack straight from the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._map: Optional[mmap.mmap] = None
+        self._map_key = None
+
+    # --- header ---
+
+    def _header(self) -> Optional[tuple]:
+        try:
+            with open(self.path, mode="rb") as f:
+                data = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        header = HEADER.unpack(data)
+        if header[0] != MAGIC or header[1] != VERSION or header[2] != RECORD.size:
+            return None
+        return header
+
+    def _write_header(self, f, stamp: storage.Stamp, count: int) -> None:
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, *stamp, count))
+
+    def in_sync(self, stamp: Optional[storage.Stamp]) -> bool:
+        header = self._header()
+        return header is not None and stamp is not None and tuple(header[3:6]) == tuple(stamp)
+
+    # --- writing ---
+
+    def rebuild(self, blocks: Iterator[Dict[str, str]], stamp: storage.Stamp) -> None:
+        tmp_path = self.path + ".tmp"
+        count = 0
+        with open(tmp_path, mode="wb") as f:
+            f.seek(HEADER.size)
+            for block in blocks:
+                f.write(encode_block(block))
+                count += 1
+            self._write_header(f, stamp, count)
+        os.replace(tmp_path, self.path)
+
+    def append(self, blocks: List[Dict[str, str]], previous: storage.Stamp, stamp: storage.Stamp) -> bool:
+        """
+        Appends the blocks that took the table from stamp previous to
+        stamp. Returns False, writing nothing, if the file did not mirror
+        previous; the caller then resyncs.
+        """
+        with storage.file_lock(self.lock_path):
+            header = self._header()
+            if header is None or tuple(header[3:6]) != tuple(previous):
+                return False
+
+            count = header[6]
+            with open(self.path, mode="r+b") as f:
+                f.seek(HEADER.size + count * RECORD.size)
+                f.write(b"".join(encode_block(block) for block in blocks))
+                f.truncate()
+                self._write_header(f, stamp, count + len(blocks))
+            return True
+
+    def sync(self, backend: storage.StorageBackend, table: str) -> None:
+        """
+        Rebuilds the file if the table changed other than through
+        append(). Any change is treated as a rewrite, so an in-place edit
+        of the table is never hidden behind a stale mirror.
+        """
+        with storage.file_lock(self.lock_path):
+            stamp = backend.stamp(table)
+            if stamp is not None and not self.in_sync(stamp):
+                self.rebuild(backend.iter_rows(table), stamp)
+
+    # --- reading ---
+
+    def _view(self) -> Optional[memoryview]:
+        """The records region of the current file, mapped read-only."""
+        header = self._header()
+        if header is None or header[6] == 0:
+            return None
+
+        st = os.stat(self.path)
+        key = (st.st_ino, st.st_size)
+        if self._map is None or self._map_key != key:
+            with open(self.path, mode="rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_key = key
+        count = min(header[6], (len(self._map) - HEADER.size) // RECORD.size)
+        return memoryview(self._map)[HEADER.size:HEADER.size + count * RECORD.size]
+
+    def __len__(self) -> int:
+        header = self._header()
+        return header[6] if header else 0
+
+    def block(self, height: int) -> Optional[records.Block]:
+        """Block at 1-based height, read at a fixed offset."""
+        view = self._view()
+        if view is None or not 1 <= height <= len(view) // RECORD.size:
+            return None
+        return _decode(RECORD.unpack_from(view, (height - 1) * RECORD.size))
+
+    def iter_blocks(self, start: int = 0) -> Iterator[records.Block]:
+        view = self._view()
+        if view is None:
+            return
+        for fields in RECORD.iter_unpack(view[start * RECORD.size:]):
+            yield _decode(fields)
+
+    def find(self, transaction_no: str) -> Optional[records.Block]:
+        """
+        Looks a block up by transaction number. Numbers are issued in
+        chain order, so T000123 is tried at height 123 first; otherwise
+        the mapping is searched for the ID at a record boundary.
+        """
+        digits = transaction_no[1:]
+        if digits.isdigit():
+            block = self.block(int(digits))
+            if block is not None and block.transaction_no == transaction_no:
+                return block
+
+        view = self._view()
+        if view is None:
+            return None
+        key = _encode_id(transaction_no).ljust(16, b"\0")
+        end = HEADER.size + len(view)
+        pos = self._map.find(key, HEADER.size, end)
+        while pos != -1:
+            if (pos - HEADER.size) % RECORD.size == 0:
+                return _decode(RECORD.unpack_from(self._map, pos))
+            pos = self._map.find(key, pos + 1, end)
+        return None
+
+    def export_csv(self, path: str, headers: List[str]) -> int:
+        """Writes the chain back out in the blockchain.csv layout."""
+        count = 0
+        with open(path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writeheader()
+            for block in self.iter_blocks():
+                writer.writerow(block)
+                count += 1
+        return count
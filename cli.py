@@ -7,6 +7,8 @@ import database
 import authorisation
 import coresystem
 import config
+import audit
+import storage
 
 
 # ---------- UI Helpers ----------
@@ -92,8 +94,10 @@ def public_ledger_page():
             pause()
             return
 
+        stats = coresystem.get_project_stats()
         for i, p in enumerate(projects, 1):
             print(f"{i}. {p['project_no']} – {p['project_description']}")
+            print(f"   {format_project_stats(stats[p['project_no']])}")
 
         print("0. Back")
         choice = input("\nSelect project: ").strip()
@@ -107,6 +111,17 @@ def public_ledger_page():
             pause()
 
 
+def format_project_stats(s):
+    text = (
+        f"Disbursed {s['total_disbursed']} | {s['transaction_count']} txns "
+        f"({s['done_count']} verified, {s['pending_count']} pending) | "
+        f"{s['beneficiary_count']} beneficiaries"
+    )
+    if s["last_activity"]:
+        text += f" | last {s['last_activity'][:19].replace('T', ' ')}"
+    return text
+
+
 def view_transactions(project_no):
     header(f"Transactions – {project_no}")
     txs = coresystem.get_ledger_by_project(project_no)
@@ -140,6 +155,7 @@ def govt_dashboard():
         print("2. View My Projects")
         print("3. Make Transaction")
         print("4. Make Project")
+        print("5. Balance History")
         print("0. Logout")
 
         c = input("\nSelect option: ").strip()
@@ -151,6 +167,8 @@ def govt_dashboard():
             make_transaction_page()
         elif c == "4":
             make_project_page()
+        elif c == "5":
+            balance_history_page()
         elif c == "0":
             authorisation.logout()
             return
@@ -199,7 +217,7 @@ def make_transaction_page():
     header("Make Transaction")
 
     to_acc = input("To Account No: ")
-    amt = float(input("Amount: "))
+    amt = input("Amount: ").strip()
     proj = input("Project No: ")
     pwd = getpass.getpass("Confirm Password: ")
 
@@ -254,6 +272,27 @@ def make_project_page():
     pause()
 
 
+def balance_history_page():
+    acc = authorisation.current_account_no()
+    header(f"Balance History – {acc}")
+
+    history = coresystem.get_balance_history(acc)
+    if not history:
+        print("No transactions.")
+    else:
+        table(
+            ["Txn No", "Time", "Change", "Balance"],
+            [(h["transaction_no"], h["timestamp"], h["delta"], h["balance"]) for h in history],
+        )
+
+    at = input("\nBalance at (timestamp or Txn No, blank to go back): ").strip()
+    if at:
+        try:
+            print(f"Balance at {at}: {coresystem.balance_at(acc, at)}")
+        except ValueError as e:
+            print(f"Error: {e}")
+        pause()
+
 
 # ---------- Auditor ----------
 
@@ -262,6 +301,9 @@ def auditor_dashboard():
         header("Auditor Dashboard")
         print("1. View Projects")
         print("2. Verify Transaction")
+        print("3. Audit Full Chain")
+        print("4. Batch Verify Transactions")
+        print("5. Reconcile Balances")
         print("0. Logout")
 
         c = input("\nSelect option: ").strip()
@@ -269,6 +311,12 @@ def auditor_dashboard():
             public_ledger_page()
         elif c == "2":
             verify_transaction_page()
+        elif c == "3":
+            audit_chain_page()
+        elif c == "4":
+            verify_batch_page()
+        elif c == "5":
+            reconcile_page()
         elif c == "0":
             authorisation.logout()
             return
@@ -288,17 +336,138 @@ def verify_transaction_page():
     pause()
 
 
+def verify_batch_page():
+    header("Batch Verify Transactions")
+    print("1. All pending transactions")
+    print("2. All transactions of a project")
+    print("3. Listed transactions")
+
+    c = input("\nSelect option: ").strip()
+    if c == "1":
+        selection = coresystem.ALL_PENDING
+    elif c == "2":
+        selection = input("Project No: ").strip()
+    elif c == "3":
+        txn_input = input("Transaction Nos (comma separated): ")
+        selection = [t.strip() for t in txn_input.split(",") if t.strip()]
+    else:
+        return
+
+    results = coresystem.verify_transactions(selection)
+    if not results:
+        print("No transactions to verify.")
+    else:
+        table(["Txn No", "Result"], sorted(results.items()))
+    pause()
+
+
+def print_audit_progress(checked, height, elapsed):
+    rate = checked / elapsed if elapsed > 0 else 0
+    print(f"  checked {checked} blocks (height {height}) – {rate:,.0f} blocks/s")
+
+
+def print_audit_report(report):
+    print()
+    if report["checkpoint_rejected"]:
+        print("Warning: last checkpoint signature invalid, audited from genesis.")
+    print(f"Resumed from height: {report['start_height']}")
+    print(f"Blocks checked:      {report['checked']}")
+    print(f"Chain height:        {report['height']}")
+    print(f"Intact up to height: {report['intact_height']}")
+    print(f"Elapsed:             {report['elapsed']:.2f}s ({report['blocks_per_sec']:,.0f} blocks/s)")
+
+    for seg in report.get("segments", []):
+        brk = seg["first_break"]
+        if brk:
+            print(
+                f"  segment {seg['start_height']}-{seg['end_height']}: "
+                f"first break at {brk['height']} ({brk['transaction_no']}): {brk['reason']}"
+            )
+
+    if report["ok"]:
+        print("\nChain intact.")
+    else:
+        brk = report["first_break"]
+        print(f"\nChain BROKEN: {report['breaks']} bad block(s).")
+        print(f"First break at height {brk['height']} ({brk['transaction_no']}): {brk['reason']}")
+
+
+def print_seal_report(report):
+    print()
+    print(f"Sealed blocks:       {report['seals']} ({report['transactions']} transactions)")
+    print(f"Awaiting a seal:     {report['unsealed']} transactions")
+    print(f"Elapsed:             {report['elapsed']:.2f}s")
+    if report["ok"]:
+        print("\nSealed blocks intact.")
+    else:
+        brk = report["first_break"]
+        print(f"\nSealed blocks BROKEN: {report['breaks']} bad block(s).")
+        print(f"First break at seal {brk['height']} ({brk['seal_no']}): {brk['reason']}")
+
+
+def audit_chain_page():
+    header("Audit Full Chain")
+    full = input("Ignore checkpoints and audit from genesis? (y/N): ").strip().lower() == "y"
+
+    report = audit.verify_chain(full=full, progress=print_audit_progress)
+    print_audit_report(report)
+    if config.BLOCK_SEALING or database.read_sealed_blocks():
+        print_seal_report(audit.verify_seals())
+    pause()
+
+
+def print_reconcile_report(report):
+    print()
+    print(f"Accounts:     {report['accounts']}")
+    print(f"Ledger rows:  {report['ledger_rows']} (up to {report['last_transaction_no']})")
+    print(f"Elapsed:      {report['elapsed']:.2f}s ({report['rows_per_sec']:,.0f} rows/s)")
+
+    derived = report["derived_openings"]
+    if derived:
+        print(f"\n{len(derived)} opening balance(s) were derived from balances at upgrade;")
+        print("drift from before then cannot be detected. Against the rank default:\n")
+        table(
+            ["Account", "Opening", "Rank Default", "Difference"],
+            [tuple(d[h] for h in audit.RECONCILE_DERIVED_HEADERS) for d in derived],
+        )
+
+    if report["ok"]:
+        print("\nAll balances reconcile with the ledger.")
+        return
+
+    print(f"\n{len(report['mismatches'])} account(s) do not reconcile:\n")
+    table(
+        ["Account", "Reason", "Opening", "Net Flow", "Expected", "Actual", "Difference"],
+        [tuple(m[h] for h in audit.RECONCILE_REPORT_HEADERS) for m in report["mismatches"]],
+    )
+
+
+def print_reconcile_progress(rows, elapsed):
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"  streamed {rows} ledger rows – {rate:,.0f} rows/s")
+
+
+def reconcile_page():
+    header("Reconcile Balances")
+    report = audit.reconcile_balances(progress=print_reconcile_progress)
+    print_reconcile_report(report)
+    pause()
+
+
 # ---------- Beneficiary ----------
 
 def beneficiary_dashboard():
     while True:
         header("Beneficiary Dashboard")
         print("1. View Projects")
+        print("2. Balance History")
         print("0. Logout")
 
         c = input("\nSelect option: ").strip()
         if c == "1":
             user_projects_page()
+        elif c == "2":
+            balance_history_page()
         elif c == "0":
             authorisation.logout()
             return
@@ -308,7 +477,132 @@ def beneficiary_dashboard():
 
 # ---------- Boot ----------
 
+def run_admin_command(command):
+    if command == "migrate-sqlite":
+        counts = database.migrate_csv_to_sqlite()
+        for name, n in counts.items():
+            print(f"{name}: {n} rows")
+        print(f"\nImported into {config.SQLITE_DB}")
+        print('Set STORAGE_BACKEND = "sqlite" in config.py to use it.')
+    elif command == "convert-money":
+        database.init_all()
+        changed = database.convert_money_to_fixed_point()
+        print(f"Rewrote {changed} account balances as fixed-point amounts.")
+    elif command == "export-chain":
+        database.init_all()
+        path = sys.argv[2] if len(sys.argv) > 2 else config.BLOCKCHAIN_CSV + ".export"
+        count = database.export_blockchain_csv(path)
+        print(f"Exported {count} blocks to {path}")
+    elif command == "balance-at":
+        database.init_all()
+        if len(sys.argv) < 4:
+            print("Usage: cli.py balance-at <account_no> <timestamp|transaction_no>")
+            sys.exit(1)
+        print(coresystem.balance_at(sys.argv[2], sys.argv[3]))
+    elif command == "rebuild-balance-history":
+        database.init_all()
+        count = database.rebuild_balance_history()
+        print(f"Rebuilt balance history: {count} rows.")
+    elif command == "reconcile":
+        database.init_all()
+        args = sys.argv[2:]
+        report = audit.reconcile_balances(progress=print_reconcile_progress)
+        print_reconcile_report(report)
+
+        if "--report" in args:
+            path = args[args.index("--report") + 1]
+            storage.write_csv(path, report["mismatches"], audit.RECONCILE_REPORT_HEADERS)
+            print(f"\nMismatch report written to {path}")
+        if not report["ok"]:
+            sys.exit(1)
+    elif command == "project-stats":
+        database.init_all()
+        stats = coresystem.get_project_stats()
+        table(
+            ["Project", "Disbursed", "Txns", "Verified", "Pending", "Beneficiaries", "Last Activity"],
+            [
+                (
+                    project_no,
+                    s["total_disbursed"],
+                    s["transaction_count"],
+                    s["done_count"],
+                    s["pending_count"],
+                    s["beneficiary_count"],
+                    s["last_activity"],
+                )
+                for project_no, s in stats.items()
+            ],
+        )
+    elif command == "rebuild-project-stats":
+        database.init_all()
+        count = database.rebuild_project_stats()
+        print(f"Rebuilt aggregates for {count} projects.")
+    elif command == "proof":
+        database.init_all()
+        if len(sys.argv) < 3:
+            print("Usage: cli.py proof <transaction_no> [tree_size]")
+            sys.exit(1)
+        try:
+            size = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            proof = coresystem.get_inclusion_proof(sys.argv[2], size)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        if proof is None:
+            print("Transaction not found.")
+            sys.exit(1)
+        for tree in ("global", "project", "sealed"):
+            if tree not in proof:
+                continue
+            p = proof[tree]
+            print(f"{tree.capitalize()} tree: leaf {p['index']} of {p['size']}, root {p['root']}")
+            for h in p["path"]:
+                print(f"  {h}")
+        ok = coresystem.verify_inclusion_proof(proof)
+        print("\nProof valid." if ok else "\nProof INVALID.")
+        if not ok:
+            sys.exit(1)
+    elif command == "seal":
+        database.init_all()
+        seals = coresystem.seal_pending()
+        for seal in seals:
+            print(
+                f"{seal['seal_no']}: {seal['transaction_count']} transactions "
+                f"({seal['first_transaction_no']}–{seal['last_transaction_no']}), "
+                f"root {seal['merkle_root']}"
+            )
+        print(f"Sealed {len(seals)} block(s).")
+    elif command == "verify-chain":
+        database.init_all()
+        args = sys.argv[2:]
+        full = "--full" in args
+
+        if "--workers" in args:
+            workers = int(args[args.index("--workers") + 1])
+            report = audit.verify_chain_parallel(
+                workers=workers, full=full, progress=print_audit_progress
+            )
+        else:
+            report = audit.verify_chain(full=full, progress=print_audit_progress)
+        print_audit_report(report)
+
+        ok = report["ok"]
+        if config.BLOCK_SEALING or database.read_sealed_blocks():
+            seal_report = audit.verify_seals()
+            print_seal_report(seal_report)
+            ok = ok and seal_report["ok"]
+        if not ok:
+            sys.exit(1)
+    else:
+        print(f"Unknown command: {command}")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_admin_command(sys.argv[1])
+        sys.exit()
+
     database.init_all()
     home_page()
 
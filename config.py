@@ -7,11 +7,45 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_DIR = os.path.join(BASE_DIR, "database")
 
+# Storage engine: "csv" (files below) or "sqlite" (SQLITE_DB).
+# Run `python cli.py migrate-sqlite` before switching to "sqlite".
+STORAGE_BACKEND = "csv"
+SQLITE_DB = os.path.join(DATABASE_DIR, "shrdaa.db")
+
 # Database file paths
 ACCOUNTS_CSV = os.path.join(DATABASE_DIR, "accounts.csv")
 LEDGER_CSV = os.path.join(DATABASE_DIR, "ledger.csv")
 BLOCKCHAIN_CSV = os.path.join(DATABASE_DIR, "blockchain.csv")
 PROJECT_DIS_CSV = os.path.join(DATABASE_DIR, "project_dis.csv")
+# Per-project totals and counts, maintained as the ledger changes
+PROJECT_STATS_CSV = os.path.join(DATABASE_DIR, "project_stats.csv")
+PROJECT_BENEFICIARIES_CSV = os.path.join(DATABASE_DIR, "project_beneficiaries.csv")
+BALANCE_JOURNAL_CSV = os.path.join(DATABASE_DIR, "balance_journal.csv")
+PASSWORD_UPGRADES_CSV = os.path.join(DATABASE_DIR, "password_upgrades.csv")
+SEQUENCES_CSV = os.path.join(DATABASE_DIR, "sequences.csv")
+# Fixed-width binary mirror of the blockchain table, read through mmap
+BLOCKCHAIN_BIN = os.path.join(DATABASE_DIR, "blockchain.bin")
+CHAIN_CHECKPOINTS_CSV = os.path.join(DATABASE_DIR, "chain_checkpoints.csv")
+SEALED_BLOCKS_CSV = os.path.join(DATABASE_DIR, "sealed_blocks.csv")
+LEDGER_PROJECT_INDEX_CSV = os.path.join(DATABASE_DIR, "ledger_project_index.csv")
+BALANCE_HISTORY_CSV = os.path.join(DATABASE_DIR, "balance_history.csv")
+BALANCE_HISTORY_INDEX_CSV = os.path.join(DATABASE_DIR, "balance_history_index.csv")
+OPENING_BALANCES_CSV = os.path.join(DATABASE_DIR, "opening_balances.csv")
+COMMIT_LOG = os.path.join(DATABASE_DIR, "commit_log.jsonl")
+
+# All writes run on one writer thread holding this lock, so several
+# processes sharing the database directory also write one at a time.
+WRITER_LOCK = os.path.join(DATABASE_DIR, "writer.lock")
+
+# Durability of appends:
+#   "none"   - left to the OS page cache
+#   "group"  - one fsync per file for each group of queued writes, before
+#              any writer in the group is answered; a crash mid-group
+#              rolls the whole group back on restart
+#   "always" - fsync after every append
+WRITE_DURABILITY = "group"
+# Seconds the writer waits for more writes to join a group
+WRITE_GROUP_WINDOW = 0.001
 
 # User role identifiers (implicit via 'rank' field in accounts.csv)
 ROLE_GOVT_OFFICER = "Govt_officer"
@@ -22,13 +56,48 @@ ROLE_AUDITOR = "Auditor"
 DEFAULT_BALANCE_GOVT_OFFICER = 100_000_000
 DEFAULT_BALANCE_BENEFICIARY = 1_000_000
 
+# Balance journal: fold deltas back into accounts.csv after this many rows
+BALANCE_JOURNAL_COMPACT_ROWS = 5_000
+
 # Cryptographic settings
 HASH_ALGORITHM = "sha256"
 
+# Block sealing. When enabled, new transactions get no block of their
+# own: pending ledger rows are sealed into one block (Merkle root of the
+# transactions, linked to the previous sealed block) once
+# SEAL_MAX_TRANSACTIONS are waiting or the oldest has waited
+# SEAL_WINDOW_SECONDS. Sealing is checked after each transfer; run
+# `python cli.py seal` periodically to seal a quiet tail.
+# Existing per-transaction blocks stay as they are.
+BLOCK_SEALING = False
+SEAL_MAX_TRANSACTIONS = 100
+SEAL_WINDOW_SECONDS = 60
+
+# Password hashing (PBKDF2-SHA256) cost; stored hashes below this are
+# upgraded on the next login
+PASSWORD_HASH_ITERATIONS = 200_000
+
+# A session that re-entered its password is re-checked cheaply for this
+# many seconds before paying the full hash again
+REAUTH_CACHE_TTL = 300
+REAUTH_CACHE_MAX = 10_000
+
+# Chain audit checkpoints are HMAC-signed with this key
+AUDIT_CHECKPOINT_KEY = os.environ.get("SHRDAA_CHECKPOINT_KEY", "checkpoint_key_shrdaa_demo")
+AUDIT_PROGRESS_EVERY = 10_000
+
+# Parallel chain audit: worker processes and blocks per segment
+AUDIT_WORKERS = os.cpu_count() or 1
+AUDIT_SEGMENT_SIZE = 50_000
+
 # Ledger rules
 VERIFICATION_PENDING = "pending"
 VERIFICATION_DONE = "done"
 
+# Ledger views: rows per page, and the most a client may request
+LEDGER_PAGE_SIZE = 50
+LEDGER_PAGE_SIZE_MAX = 500
+
 # Session settings (single-user demo)
 SESSION_ACTIVE = True
 
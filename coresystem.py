@@ -2,12 +2,20 @@
 # Core business logic for SHRDAA
 
 import hashlib
+import re
 import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timezone
-from typing import Dict, List
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import config
+import credentials
 import database
+import merkle
+import money
+import roles
+import writer
 
 
 # ---------- Utility Functions ----------
@@ -22,51 +30,53 @@ def _current_timestamp() -> str:
 
 # ---------- ID Generators ----------
 
+_ID_FORMATS = {
+    "account": "A{:05d}",
+    "transaction": "T{:06d}",
+    "project": "P{:05d}",
+    "seal": "S{:06d}",
+}
+
+
+def reserve_ids(sequence: str, count: int) -> List[str]:
+    """
+    Reserves a block of consecutive IDs, e.g. for batch imports.
+    """
+    first = database.allocate_ids(sequence, count)
+    fmt = _ID_FORMATS[sequence]
+    return [fmt.format(n) for n in range(first, first + count)]
+
+
 def generate_account_no() -> str:
-    accounts = database.read_accounts()
-    return f"A{len(accounts) + 1:05d}"
+    return reserve_ids("account", 1)[0]
 
 
 def generate_transaction_no() -> str:
-    ledger = database.read_ledger()
-    return f"T{len(ledger) + 1:06d}"
+    return reserve_ids("transaction", 1)[0]
 
 
 def generate_project_no() -> str:
-    projects = database.read_project_dis()
-    return f"P{len(projects) + 1:05d}"
+    return reserve_ids("project", 1)[0]
 
 
 # ---------- Role Resolution ----------
 
-#def resolve_user_role(rank: str) -> str:
- #   if rank == config.ROLE_AUDITOR:
-  #      return config.ROLE_AUDITOR
-   # if rank.strip() == "":
-    #    return config.ROLE_BENEFICIARY
-    #return config.ROLE_GOVT_OFFICER
-def resolve_user_role(rank: str) -> str:
-    r = rank.strip().lower()
-
-    if r == "auditor":
-        return config.ROLE_AUDITOR
-
-    govt_keywords = [
-        "collector",
-        "secretary",
-        "joint secretary",
-        "commissioner",
-        "officer"
-    ]
+# The rules live in roles.py so the account repository can precompute
+# each account's role; kept here for existing callers.
+resolve_user_role = roles.resolve_user_role
 
-    for kw in govt_keywords:
-        if kw in r:
-            return config.ROLE_GOVT_OFFICER
 
-    return config.ROLE_BENEFICIARY
+# ---------- User Management ----------
 
+def default_balance(rank_or_company: str) -> str:
+    """Balance a new account of this rank gets when none is given."""
+    role = resolve_user_role(rank_or_company)
+    if role == config.ROLE_GOVT_OFFICER:
+        return money.canonical(config.DEFAULT_BALANCE_GOVT_OFFICER)
+    if role == config.ROLE_BENEFICIARY:
+        return money.canonical(config.DEFAULT_BALANCE_BENEFICIARY)
+    return money.canonical(0)
 
-# ---------- User Management ----------
 
 def create_user(
     name: str,
@@ -76,19 +86,26 @@ def create_user(
     password: str,
     balance: str = None,
 ) -> Dict[str, str]:
+    # Hashed before queueing: PBKDF2 would otherwise hold up the writer.
+    password_hash = credentials.hash_password(password)
+    return _create_account(name, age, location, rank_or_company, password_hash, balance)
 
-    account_no = generate_account_no()
-    password_hash = _sha256(password)
 
-    role = resolve_user_role(rank_or_company)
+@writer.serialized
+def _create_account(
+    name: str,
+    age: str,
+    location: str,
+    rank_or_company: str,
+    password_hash: str,
+    balance: str = None,
+) -> Dict[str, str]:
+
+    account_no = generate_account_no()
 
     if balance is None:
-        if role == config.ROLE_GOVT_OFFICER:
-            balance = str(config.DEFAULT_BALANCE_GOVT_OFFICER)
-        elif role == config.ROLE_BENEFICIARY:
-            balance = str(config.DEFAULT_BALANCE_BENEFICIARY)
-        else:
-            balance = "0"
+        balance = default_balance(rank_or_company)
+    balance = money.canonical(balance)
 
     account_row = {
         "name": name,
@@ -107,6 +124,7 @@ def create_user(
 
 # ---------- Project Management ----------
 
+@writer.serialized
 def create_project(
     account_nos: List[str],
     project_description: str,
@@ -140,148 +158,564 @@ def create_project(
 # ---------- Transaction Processing ----------
 
 def _get_account(account_no: str) -> Dict[str, str]:
-    for acc in database.read_accounts():
-        if acc["account_no"] == account_no:
-            return acc
-    return None
+    return database.get_account(account_no)
 
 
-def process_transaction(
-    from_account_no: str,
-    to_account_no: str,
+def _validate_transfer(
+    from_perms: Optional[roles.AccountPermissions],
+    to_perms: Optional[roles.AccountPermissions],
     project_no: str,
-    amount: float,
-) -> Dict[str, str]:
-
-    from_acc = _get_account(from_account_no)
-    to_acc = _get_account(to_account_no)
+    amount: int,
+    from_balance: int,
+) -> None:
+    if not from_perms or not to_perms:
+        raise ValueError("Invalid account")
 
     # --- Project authorization check ---
-    authorised_projects = from_acc["authorised_projects_no"].split(",") \
-        if from_acc["authorised_projects_no"].strip() else []
-
-    if project_no not in authorised_projects:
+    if project_no not in from_perms.projects:
         raise ValueError("Sender is not authorised for this project")
 
-
-    if not from_acc or not to_acc:
-        raise ValueError("Invalid account")
-
-    from_role = resolve_user_role(from_acc["rank"])
-    to_role = resolve_user_role(to_acc["rank"])
-
-    if from_role == config.ROLE_GOVT_OFFICER and to_role in (
+    if from_perms.role == config.ROLE_GOVT_OFFICER and to_perms.role in (
         config.ROLE_GOVT_OFFICER,
         config.ROLE_AUDITOR,
     ):
         raise ValueError("Invalid transaction")
 
-    new_balance = float(from_acc["balance"]) - float(amount)
-    if new_balance < 0:
+    if amount <= 0:
+        raise ValueError("Invalid amount")
+
+    if from_balance - amount < 0:
         raise ValueError("Invalid transaction")
 
-    from_acc["balance"] = str(new_balance)
-    to_acc["balance"] = str(float(to_acc["balance"]) + float(amount))
 
-    accounts = database.read_accounts()
-    for acc in accounts:
-        if acc["account_no"] == from_account_no:
-            acc["balance"] = from_acc["balance"]
-        if acc["account_no"] == to_account_no:
-            acc["balance"] = to_acc["balance"]
+@writer.serialized
+def process_transactions(batch: List[Dict[str, str]]) -> List[Dict[str, object]]:
+    """
+    Processes many transfers with one append to each table.
+
+    Each item has from_account_no, to_account_no, project_no and amount
+    (rupees, at most two decimals). Money is handled as integer paise.
+    Items are validated in order against in-memory running balances; a
+    rejected item does not stop the rest. IDs are reserved as one block
+    and blocks are chain-hashed in memory.
+
+    Returns one result per item:
+    {"row", "ok", "transaction_no", "transaction", "error"}.
+    """
+    permissions = {}
+    balances = {}
+    results = []
+    accepted = []
+
+    def permissions_of(account_no):
+        if account_no not in permissions:
+            permissions[account_no] = database.get_account_permissions(account_no)
+            if permissions[account_no]:
+                balances[account_no] = money.to_paise(_get_account(account_no)["balance"])
+        return permissions[account_no]
+
+    for i, item in enumerate(batch):
+        result = {"row": i, "ok": False, "transaction_no": None, "transaction": None, "error": None}
+        results.append(result)
+        try:
+            from_account_no = item["from_account_no"]
+            to_account_no = item["to_account_no"]
+            amount = money.to_paise(item["amount"])
+
+            _validate_transfer(
+                permissions_of(from_account_no),
+                permissions_of(to_account_no),
+                item["project_no"],
+                amount,
+                balances.get(from_account_no, 0),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            result["error"] = str(e) if isinstance(e, ValueError) else "Malformed row"
+            continue
+
+        balances[from_account_no] -= amount
+        balances[to_account_no] += amount
+        accepted.append((result, item, amount))
+
+    if not accepted:
+        return results
+
+    transaction_nos = reserve_ids("transaction", len(accepted))
+    ledger_rows = []
+    deltas = []
+
+    for transaction_no, (result, item, amount) in zip(transaction_nos, accepted):
+        ledger_row = {
+            "transaction_no": transaction_no,
+            "project_no": item["project_no"],
+            "from_account_no": item["from_account_no"],
+            "to_account_no": item["to_account_no"],
+            "amount": money.format_paise(amount),
+            "timestamp": _current_timestamp(),
+            "verification_status": config.VERIFICATION_PENDING,
+        }
+        ledger_rows.append(ledger_row)
+        deltas.append((item["from_account_no"], -amount, transaction_no))
+        deltas.append((item["to_account_no"], amount, transaction_no))
 
-    database.update_accounts(accounts)
+        result.update(ok=True, transaction_no=transaction_no, transaction=ledger_row)
 
-    transaction_no = generate_transaction_no()
-    timestamp = _current_timestamp()
-
-    ledger_row = {
-        "transaction_no": transaction_no,
-        "project_no": project_no,
-        "from_account_no": from_account_no,
-        "to_account_no": to_account_no,
-        "amount": str(amount),
-        "timestamp": timestamp,
-        "verification_status": config.VERIFICATION_PENDING,
-    }
+    if config.BLOCK_SEALING:
+        database.commit_transactions(deltas, ledger_rows, [])
+        _seal_pending()
+    else:
+        database.commit_transactions(deltas, ledger_rows, _build_blocks(ledger_rows))
+
+    return results
 
-    database.append_ledger(ledger_row)
 
-    _append_blockchain_entry(ledger_row)
+def process_transaction(
+    from_account_no: str,
+    to_account_no: str,
+    project_no: str,
+    amount: str,
+) -> Dict[str, str]:
+
+    result = process_transactions([
+        {
+            "from_account_no": from_account_no,
+            "to_account_no": to_account_no,
+            "project_no": project_no,
+            "amount": amount,
+        }
+    ])[0]
+
+    if not result["ok"]:
+        raise ValueError(result["error"])
 
-    return ledger_row
+    return result["transaction"]
 
 
 # ---------- Blockchain ----------
 
+def compute_block_hash(ledger_row: Dict[str, str], previous_hash: str) -> str:
+    hash_input = (
+        f'{ledger_row["transaction_no"]}|'
+        f'{ledger_row["project_no"]}|'
+        f'{ledger_row["from_account_no"]}|'
+        f'{ledger_row["to_account_no"]}|'
+        f'{ledger_row["amount"]}|'
+        f'{ledger_row["timestamp"]}|'
+        f'{previous_hash}'
+    )
+    return _sha256(hash_input)
+
+
+def _build_blocks(ledger_rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Chain-hashes blocks for ledger_rows in order, starting at the chain tip.
+    """
+    tip = database.get_chain_tip()
+    previous_hash = tip["current_hash"] if tip else "GENESIS"
+
+    blocks = []
+    for ledger_row in ledger_rows:
+        current_hash = compute_block_hash(ledger_row, previous_hash)
+        blocks.append({
+            "transaction_no": ledger_row["transaction_no"],
+            "project_no": ledger_row["project_no"],
+            "previous_hash": previous_hash,
+            "current_hash": current_hash,
+        })
+        previous_hash = current_hash
+
+    return blocks
+
+
 def _append_blockchain_entry(ledger_row: Dict[str, str]) -> None:
-    chain = database.read_blockchain()
-    previous_hash = chain[-1]["current_hash"] if chain else "GENESIS"
+    database.append_blockchain_rows(_build_blocks([ledger_row]))
+
 
+# ---------- Block Sealing ----------
+
+def compute_transaction_hash(ledger_row: Dict[str, str]) -> str:
+    """Hash of one transaction's fields, the Merkle leaf data in a sealed block."""
     hash_input = (
         f'{ledger_row["transaction_no"]}|'
         f'{ledger_row["project_no"]}|'
         f'{ledger_row["from_account_no"]}|'
         f'{ledger_row["to_account_no"]}|'
         f'{ledger_row["amount"]}|'
-        f'{ledger_row["timestamp"]}|'
+        f'{ledger_row["timestamp"]}'
+    )
+    return _sha256(hash_input)
+
+
+def compute_seal_merkle_root(ledger_rows: List[Dict[str, str]]) -> str:
+    return merkle.merkle_root([merkle.leaf_hash(compute_transaction_hash(tx)) for tx in ledger_rows])
+
+
+def compute_seal_hash(seal_row: Dict[str, str], previous_hash: str) -> str:
+    hash_input = (
+        f'{seal_row["seal_no"]}|'
+        f'{seal_row["first_transaction_no"]}|'
+        f'{seal_row["last_transaction_no"]}|'
+        f'{seal_row["transaction_count"]}|'
+        f'{seal_row["merkle_root"]}|'
+        f'{seal_row["sealed_at"]}|'
         f'{previous_hash}'
     )
+    return _sha256(hash_input)
+
+
+def seal_is_intact(seal_row: Dict[str, str], ledger_rows: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Returns the reason a sealed block does not match its ledger rows, or
+    None if it is intact. The link to the previous seal is not checked.
+    """
+    if len(ledger_rows) != int(seal_row["transaction_count"]):
+        return "transaction count mismatch"
+    if compute_seal_merkle_root(ledger_rows) != seal_row["merkle_root"]:
+        return "merkle root mismatch"
+    if compute_seal_hash(seal_row, seal_row["previous_hash"]) != seal_row["current_hash"]:
+        return "hash mismatch"
+    return None
 
-    current_hash = _sha256(hash_input)
 
-    block = {
-        "transaction_no": ledger_row["transaction_no"],
-        "project_no": ledger_row["project_no"],
-        "previous_hash": previous_hash,
-        "current_hash": current_hash,
-    }
+def get_unsealed_rows() -> List[Dict[str, str]]:
+    """Ledger rows after both the chain tip and the last sealed block."""
+    marks = [database.get_chain_tip(), database.get_seal_tip()]
+    numbers = [
+        (database.transaction_number(no), no)
+        for no in (
+            marks[0] and marks[0]["transaction_no"],
+            marks[1] and marks[1]["last_transaction_no"],
+        )
+        if no
+    ]
+    return database.get_ledger_rows_after(max(numbers)[1] if numbers else None)
+
+
+def _window_elapsed(oldest_row: Dict[str, str]) -> bool:
+    oldest = datetime.fromisoformat(oldest_row["timestamp"])
+    if oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - oldest).total_seconds() >= config.SEAL_WINDOW_SECONDS
+
+
+def _seal_pending(force: bool = False) -> List[Dict[str, str]]:
+    rows = get_unsealed_rows()
+    size = config.SEAL_MAX_TRANSACTIONS
+    if rows and not (force or _window_elapsed(rows[0])):
+        # Count trigger only: seal full blocks, the rest keeps waiting.
+        rows = rows[:len(rows) - len(rows) % size]
+    if not rows:
+        return []
+
+    tip = database.get_seal_tip() or database.get_chain_tip()
+    previous_hash = tip["current_hash"] if tip else "GENESIS"
+    batches = [rows[i:i + size] for i in range(0, len(rows), size)]
+
+    seals = []
+    for seal_no, batch in zip(reserve_ids("seal", len(batches)), batches):
+        seal_row = {
+            "seal_no": seal_no,
+            "first_transaction_no": batch[0]["transaction_no"],
+            "last_transaction_no": batch[-1]["transaction_no"],
+            "transaction_count": str(len(batch)),
+            "merkle_root": compute_seal_merkle_root(batch),
+            "sealed_at": _current_timestamp(),
+            "previous_hash": previous_hash,
+        }
+        seal_row["current_hash"] = compute_seal_hash(seal_row, previous_hash)
+        database.append_sealed_block(seal_row)
+        seals.append(seal_row)
+        previous_hash = seal_row["current_hash"]
+    return seals
+
 
-    database.append_blockchain(block)
+@writer.serialized
+def seal_pending(force: bool = True) -> List[Dict[str, str]]:
+    """
+    Seals transactions still waiting for a block, in blocks of at most
+    config.SEAL_MAX_TRANSACTIONS. Unless force=False, seals even if
+    neither the count nor the time window is reached.
+    Returns the new sealed blocks.
+    """
+    return _seal_pending(force)
 
 
 # ---------- Verification ----------
 
-def verify_transaction(transaction_no: str) -> bool:
+VERIFY_OK = "verified"
+VERIFY_FAILED = "failed"
+VERIFY_ALREADY_DONE = "already_verified"
+VERIFY_NOT_FOUND = "not_found"
+
+ALL_PENDING = "all_pending"
+
+
+@writer.serialized
+def verify_transactions(selection) -> Dict[str, str]:
+    """
+    Verifies many transactions with one read of the ledger, direct block
+    lookups (or one Merkle root per sealed block) and a single write of
+    verification_status.
+
+    selection is a list of transaction numbers, a project number, or
+    ALL_PENDING. Returns {transaction_no: VERIFY_* result}.
+    """
+    if config.BLOCK_SEALING:
+        _seal_pending(force=True)
     ledger = database.read_ledger()
-    chain = database.read_blockchain()
+
+    if selection == ALL_PENDING:
+        wanted = [
+            tx["transaction_no"]
+            for tx in ledger
+            if tx["verification_status"] != config.VERIFICATION_DONE
+        ]
+    elif isinstance(selection, str):
+        wanted = [tx["transaction_no"] for tx in ledger if tx["project_no"] == selection]
+    else:
+        wanted = list(selection)
 
     ledger_map = {tx["transaction_no"]: tx for tx in ledger}
-    chain_map = {blk["transaction_no"]: blk for blk in chain}
+    results = {}
+    targets = set()
+
+    for transaction_no in wanted:
+        tx = ledger_map.get(transaction_no)
+        if tx is None:
+            results[transaction_no] = VERIFY_NOT_FOUND
+        elif tx["verification_status"] == config.VERIFICATION_DONE:
+            results[transaction_no] = VERIFY_ALREADY_DONE
+        else:
+            targets.add(transaction_no)
+
+    sealed, firsts, ends = database.get_seal_ranges()
+    seals = {}
+    for transaction_no in targets:
+        number = database.transaction_number(transaction_no)
+        i = bisect_left(ends, number)
+        if i < len(ends) and firsts[i] <= number:
+            seals[transaction_no] = sealed[i]
+    blocks = database.get_blocks([no for no in targets if not seals.get(no)]) if targets else {}
+
+    # A sealed transaction is verified by re-deriving its seal's Merkle
+    # root, once per seal whatever the number of targets in it.
+    needed = {seal["seal_no"]: seal for seal in seals.values() if seal}
+    members = {seal_no: [] for seal_no in needed}
+    if needed:
+        ranges = sorted(
+            (
+                database.transaction_number(seal["last_transaction_no"]),
+                database.transaction_number(seal["first_transaction_no"]),
+                seal_no,
+            )
+            for seal_no, seal in needed.items()
+        )
+        ends = [high for high, _, _ in ranges]
+        for tx in ledger:
+            number = database.transaction_number(tx["transaction_no"])
+            i = bisect_left(ends, number)
+            if i < len(ranges) and ranges[i][1] <= number:
+                members[ranges[i][2]].append(tx)
+    intact_seals = {
+        seal_no: seal_is_intact(seal, members[seal_no]) is None
+        for seal_no, seal in needed.items()
+    }
 
-    if transaction_no not in ledger_map:
-        raise ValueError("Transaction not found")
+    verified = []
+    for transaction_no in wanted:
+        if transaction_no not in targets:
+            continue
+        tx = ledger_map[transaction_no]
+        block = blocks.get(transaction_no)
+        seal = seals.get(transaction_no)
+
+        if seal:
+            ok = intact_seals[seal["seal_no"]]
+        else:
+            ok = bool(block) and compute_block_hash(tx, block["previous_hash"]) == block["current_hash"]
+
+        if ok:
+            tx["verification_status"] = config.VERIFICATION_DONE
+            results[transaction_no] = VERIFY_OK
+            verified.append(tx)
+        else:
+            results[transaction_no] = VERIFY_FAILED
 
-    tx = ledger_map[transaction_no]
+    if verified:
+        database.update_ledger(ledger, verified=verified)
 
-    if tx["verification_status"] == config.VERIFICATION_DONE:
+    return {transaction_no: results[transaction_no] for transaction_no in wanted}
+
+
+def verify_transaction(transaction_no: str) -> bool:
+    result = verify_transactions([transaction_no])[transaction_no]
+
+    if result == VERIFY_NOT_FOUND:
+        raise ValueError("Transaction not found")
+
+    if result == VERIFY_ALREADY_DONE:
         raise ValueError("Already verified")
 
-    block = chain_map.get(transaction_no)
-    if not block:
+    return result == VERIFY_OK
+
+
+# ---------- Inclusion Proofs ----------
+
+def get_merkle_roots() -> Dict[str, object]:
+    return database.get_merkle_roots()
+
+
+def get_inclusion_proof(transaction_no: str, size: Optional[int] = None) -> Optional[Dict[str, object]]:
+    """
+    Everything needed to check one transaction without the rest of the
+    chain: its ledger row, its block, and audit paths to the global and
+    project Merkle roots. None if the transaction has no block.
+
+    The roots are the current ones, or those of the global tree at size
+    leaves (as listed by get_merkle_roots() when it was published).
+    size does not apply to sealed transactions, whose proof is against
+    their seal. Raises ValueError for a size the block is not under.
+    """
+    tx = database.get_ledger_row(transaction_no)
+    if tx is None:
+        return None
+
+    block = database.get_block(transaction_no)
+    if block is None:
+        return _seal_inclusion_proof(tx)
+
+    paths = database.get_merkle_proof(transaction_no, block["project_no"], size)
+    if paths is None:
+        return None
+    return {"transaction": tx, "block": block, **paths}
+
+
+def _seal_inclusion_proof(tx: Dict[str, str]) -> Optional[Dict[str, object]]:
+    """Proof for a sealed transaction: an audit path to its seal's Merkle root."""
+    seal = database.find_seal(tx["transaction_no"])
+    if seal is None:
+        return None
+
+    tree = merkle.MerkleTree()
+    index = None
+    for i, member in enumerate(database.iter_ledger_between(seal["first_transaction_no"], seal["last_transaction_no"])):
+        tree.append(merkle.leaf_hash(compute_transaction_hash(member)))
+        if member["transaction_no"] == tx["transaction_no"]:
+            index = i
+    if index is None:
+        return None
+
+    return {
+        "transaction": tx,
+        "seal": seal,
+        "sealed": {
+            "index": index,
+            "size": len(tree),
+            "root": tree.root(),
+            "path": tree.proof(index),
+        },
+    }
+
+
+def verify_inclusion_proof(proof: Dict[str, object], trusted_root: Optional[str] = None) -> bool:
+    """
+    Checks a proof from get_inclusion_proof() in O(log N) hashes: the
+    block hash must match the ledger row, and the block must sit under
+    both Merkle roots. If trusted_root is given (a global root published
+    earlier), the proof's global root must equal it; build the proof at
+    the size published with that root.
+
+    For a sealed transaction the ledger row must sit under the seal's
+    Merkle root and the seal hash must cover that root; trusted_root is
+    then compared with the seal hash.
+    """
+    if "seal" in proof:
+        return _verify_seal_inclusion_proof(proof, trusted_root)
+
+    try:
+        tx, block = proof["transaction"], proof["block"]
+        if tx["transaction_no"] != block["transaction_no"] or tx["project_no"] != block["project_no"]:
+            return False
+        if compute_block_hash(tx, block["previous_hash"]) != block["current_hash"]:
+            return False
+        if trusted_root is not None and proof["global"]["root"] != trusted_root:
+            return False
+
+        leaf = merkle.leaf_hash(block["current_hash"])
+        return all(
+            merkle.verify_inclusion(leaf, int(p["index"]), int(p["size"]), list(p["path"]), p["root"])
+            for p in (proof["global"], proof["project"])
+        )
+    except (KeyError, TypeError, ValueError):
         return False
 
-    hash_input = (
-        f'{tx["transaction_no"]}|'
-        f'{tx["project_no"]}|'
-        f'{tx["from_account_no"]}|'
-        f'{tx["to_account_no"]}|'
-        f'{tx["amount"]}|'
-        f'{tx["timestamp"]}|'
-        f'{block["previous_hash"]}'
-    )
 
-    recalculated_hash = _sha256(hash_input)
+def _verify_seal_inclusion_proof(proof: Dict[str, object], trusted_root: Optional[str]) -> bool:
+    try:
+        tx, seal, path = proof["transaction"], proof["seal"], proof["sealed"]
+        number = database.transaction_number(tx["transaction_no"])
+        if not (
+            database.transaction_number(seal["first_transaction_no"])
+            <= number
+            <= database.transaction_number(seal["last_transaction_no"])
+        ):
+            return False
+        if path["root"] != seal["merkle_root"] or int(path["size"]) != int(seal["transaction_count"]):
+            return False
+        if compute_seal_hash(seal, seal["previous_hash"]) != seal["current_hash"]:
+            return False
+        if trusted_root is not None and seal["current_hash"] != trusted_root:
+            return False
+
+        leaf = merkle.leaf_hash(compute_transaction_hash(tx))
+        return merkle.verify_inclusion(leaf, int(path["index"]), int(path["size"]), list(path["path"]), path["root"])
+    except (KeyError, TypeError, ValueError):
+        return False
 
-    verified = recalculated_hash == block["current_hash"]
 
-    if verified:
-        for row in ledger:
-            if row["transaction_no"] == transaction_no:
-                row["verification_status"] = config.VERIFICATION_DONE
-        database.update_ledger(ledger)
+# ---------- Balance History ----------
 
-    return verified
+_TRANSACTION_NO = re.compile(r"T\d+")
+
+
+def get_balance_history(account_no: str) -> List[Dict[str, str]]:
+    """
+    An account's balance after each of its transactions, oldest first:
+    {account_no, transaction_no, timestamp, delta, balance}.
+    """
+    if _get_account(account_no) is None:
+        raise ValueError("Invalid account")
+    return database.get_balance_history(account_no)
+
+
+def balance_at(account_no: str, at: str) -> str:
+    """
+    Balance of an account as of a point in time, given as a
+    transaction_no (balance just after that transaction) or an ISO
+    timestamp (after everything up to and including it). Before the
+    account's first transaction this is its opening balance.
+    """
+    account = _get_account(account_no)
+    if account is None:
+        raise ValueError("Invalid account")
+
+    history = database.get_balance_history(account_no)
+    at = at.strip()
+    if _TRANSACTION_NO.fullmatch(at):
+        i = bisect_right(history, int(at[1:]), key=lambda row: int(row["transaction_no"][1:]))
+    else:
+        try:
+            moment = database.normalize_timestamp(at)
+        except ValueError:
+            raise ValueError("Invalid timestamp")
+        i = bisect_right(history, moment, key=lambda row: row["timestamp"])
+
+    if i:
+        return history[i - 1]["balance"]
+    if history:
+        first = history[0]
+        return money.format_paise(money.to_paise(first["balance"]) - money.to_paise(first["delta"]))
+    return money.canonical(account["balance"])
 
 
 # ---------- Data Fetchers for UI ----------
@@ -290,19 +724,71 @@ def get_all_projects() -> List[Dict[str, str]]:
     return database.read_project_dis()
 
 
+def get_project_stats() -> Dict[str, Dict[str, object]]:
+    """
+    Aggregates for every project: total_disbursed, transaction_count,
+    pending_count, done_count, beneficiary_count and last_activity
+    (empty if the project has no transactions yet).
+    """
+    stats = database.get_project_stats()
+    empty = {
+        "total_disbursed": money.format_paise(0),
+        "transaction_count": 0,
+        "pending_count": 0,
+        "done_count": 0,
+        "beneficiary_count": 0,
+        "last_activity": "",
+    }
+    return {p["project_no"]: stats.get(p["project_no"], empty) for p in get_all_projects()}
+
+
 def get_ledger_by_project(project_no: str) -> List[Dict[str, str]]:
-    return [
-        tx
-        for tx in database.read_ledger()
-        if tx["project_no"] == project_no
-    ]
+    return database.read_ledger_by_project(project_no)
+
+
+def iter_ledger_by_project(
+    project_no: str,
+    after: Optional[str] = None,
+) -> Iterator[Dict[str, str]]:
+    """
+    Streams a project's transactions, optionally only those numbered
+    after the transaction_no cursor.
+    """
+    return database.iter_ledger_by_project(project_no, after)
+
+
+def get_ledger_page(
+    project_no: str,
+    after: Optional[str] = None,
+    limit: int = config.LEDGER_PAGE_SIZE,
+) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    Returns up to limit transactions after the cursor, and the cursor
+    for the next page (None on the last page).
+    """
+    rows = list(islice(iter_ledger_by_project(project_no, after), limit + 1))
+    next_cursor = rows[limit - 1]["transaction_no"] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def get_transaction(transaction_no: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Returns {"transaction": ledger row, "block": chain block or None},
+    or None if the transaction does not exist.
+    """
+    tx = database.get_ledger_row(transaction_no)
+    if tx is None:
+        return None
+    return {"transaction": tx, "block": database.get_block(transaction_no)}
+
+
+def get_chain_tip() -> Optional[Dict[str, str]]:
+    return database.get_chain_tip()
 
 
 def get_user_projects(account_no: str) -> List[str]:
-    acc = _get_account(account_no)
-    if not acc or acc["authorised_projects_no"].strip() == "":
-        return []
-    return acc["authorised_projects_no"].split(",")
+    perms = database.get_account_permissions(account_no)
+    return sorted(perms.projects) if perms else []
 
 
 def get_account_info(account_no: str) -> Dict[str, str]:
@@ -0,0 +1,148 @@
+# credentials.py
+# Password hashing and re-authorisation cache for SHRDAA
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+import database
+import writer
+
+
+# ---------- Password Hashes ----------
+
+# Stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>".
+# Accounts created before salting hold a bare sha256 hex digest; these
+# are upgraded on the next successful login.
+PBKDF2_SCHEME = "pbkdf2_sha256"
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations).hex()
+
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    iterations = config.PASSWORD_HASH_ITERATIONS
+    return f"{PBKDF2_SCHEME}${iterations}${salt.hex()}${_pbkdf2(password, salt, iterations)}"
+
+
+def _parse(stored: str) -> Optional[Tuple[int, bytes, str]]:
+    """
+    (iterations, salt, hash) of a PBKDF2 hash, None for a legacy digest.
+    Raises ValueError for a corrupt PBKDF2 hash.
+    """
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != PBKDF2_SCHEME:
+        return None
+    iterations = int(parts[1])
+    if iterations < 1:
+        raise ValueError("Invalid password hash")
+    return iterations, bytes.fromhex(parts[2]), parts[3]
+
+
+def verify_password(password: str, stored: str) -> bool:
+    if password is None or not stored:
+        return False
+    try:
+        parsed = _parse(stored)
+    except ValueError:
+        return False
+    if parsed is None:
+        legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, stored)
+    iterations, salt, expected = parsed
+    return hmac.compare_digest(_pbkdf2(password, salt, iterations), expected)
+
+
+def needs_rehash(stored: str) -> bool:
+    try:
+        parsed = _parse(stored)
+    except ValueError:
+        return True
+    return parsed is None or parsed[0] < config.PASSWORD_HASH_ITERATIONS
+
+
+@writer.serialized
+def _upgrade_hash(account_no: str, old_hash: str, new_hash: str) -> None:
+    # Skipped if the password was changed since it was checked.
+    database.upgrade_password_hash(account_no, old_hash, new_hash)
+
+
+# ---------- Login ----------
+
+def authenticate(account_no: str, password: str) -> Optional[Dict[str, str]]:
+    """
+    Returns the account if the password matches, else None.
+    Legacy or under-strength hashes are rehashed on success.
+    """
+    acc = database.get_account(account_no) if account_no else None
+    if not acc or not verify_password(password, acc["password_hash"]):
+        return None
+
+    if needs_rehash(acc["password_hash"]):
+        # Hashed before queueing, so PBKDF2 does not hold up the writer.
+        _upgrade_hash(account_no, acc["password_hash"], hash_password(password))
+        acc = database.get_account(account_no)
+    return acc
+
+
+def new_session_id() -> str:
+    return secrets.token_hex(16)
+
+
+# ---------- Re-authorisation Cache ----------
+
+# (session_id, account_no) -> (expires_at, password_hash, password digest).
+# After a full check the password is remembered only as an HMAC under a
+# per-process key, so a repeat within REAUTH_CACHE_TTL costs one HMAC
+# instead of a PBKDF2 run. The password is still required every time.
+_REAUTH_KEY = secrets.token_bytes(32)
+_reauth_cache: Dict[Tuple[str, str], Tuple[float, str, str]] = {}
+_reauth_lock = threading.Lock()
+
+
+def _digest(password: str) -> str:
+    return hmac.new(_REAUTH_KEY, password.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def reauthorize(session_id: Optional[str], account_no: str, password: str) -> bool:
+    """
+    Re-checks the password of an already logged-in account before a
+    sensitive action. Failures are never cached, and a cached success is
+    dropped once the stored hash changes.
+    """
+    acc = database.get_account(account_no)
+    if not acc or password is None:
+        return False
+
+    key = (session_id, account_no)
+    now = time.monotonic()
+
+    if session_id:
+        with _reauth_lock:
+            cached = _reauth_cache.get(key)
+        if cached and cached[0] > now and cached[1] == acc["password_hash"]:
+            return hmac.compare_digest(cached[2], _digest(password))
+
+    if authenticate(account_no, password) is None:
+        return False
+
+    if session_id:
+        acc = database.get_account(account_no)
+        with _reauth_lock:
+            _reauth_cache[key] = (now + config.REAUTH_CACHE_TTL, acc["password_hash"], _digest(password))
+            if len(_reauth_cache) > config.REAUTH_CACHE_MAX:
+                for stale in [k for k, v in _reauth_cache.items() if v[0] <= now]:
+                    del _reauth_cache[stale]
+    return True
+
+
+def forget_session(session_id: Optional[str]) -> None:
+    with _reauth_lock:
+        for key in [k for k in _reauth_cache if k[0] == session_id]:
+            del _reauth_cache[key]
@@ -1,38 +1,68 @@
 # database.py
-# CSV persistence layer for SHRDAA
+# Persistence layer for SHRDAA
 
-import csv
+import hashlib
+import json
 import os
-from typing import List, Dict
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Iterator, List, Dict, Optional, Set, Tuple
+import chainfile
 import config
+import merkle
+import money
+import records
+import roles
+import storage
 
 
-# ---------- Internal Helpers ----------
+# ---------- Storage Engine ----------
 
-def _ensure_file_exists(path: str, headers: List[str]) -> None:
-    if not os.path.exists(path):
-        with open(path, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
+ACCOUNTS = "accounts"
+BALANCE_JOURNAL = "balance_journal"
+PASSWORD_UPGRADES = "password_upgrades"
+LEDGER = "ledger"
+BLOCKCHAIN = "blockchain"
+PROJECT_DIS = "project_dis"
+CHAIN_CHECKPOINTS = "chain_checkpoints"
+BALANCE_HISTORY = "balance_history"
+OPENING_BALANCES = "opening_balances"
+SEALED_BLOCKS = "sealed_blocks"
 
+_backend_lock = threading.Lock()
+_backend_instance: Optional[storage.StorageBackend] = None
 
-def _read_csv(path: str) -> List[Dict[str, str]]:
-    with open(path, mode="r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
 
+def _table_specs() -> storage.TableSpecs:
+    return {
+        ACCOUNTS: (ACCOUNTS_HEADERS, ["account_no"], records.Account.from_values),
+        BALANCE_JOURNAL: (BALANCE_JOURNAL_HEADERS, ["transaction_no"], None),
+        PASSWORD_UPGRADES: (PASSWORD_UPGRADES_HEADERS, ["account_no"], None),
+        LEDGER: (LEDGER_HEADERS, ["transaction_no", "project_no"], records.LedgerEntry.from_values),
+        BLOCKCHAIN: (BLOCKCHAIN_HEADERS, ["transaction_no", "project_no"], records.Block.from_values),
+        PROJECT_DIS: (PROJECT_DIS_HEADERS, ["project_no"], records.Project.from_values),
+        CHAIN_CHECKPOINTS: (CHAIN_CHECKPOINTS_HEADERS, [], None),
+        BALANCE_HISTORY: (BALANCE_HISTORY_HEADERS, ["account_no"], None),
+        OPENING_BALANCES: (OPENING_BALANCES_HEADERS, ["account_no"], None),
+        SEALED_BLOCKS: (SEALED_BLOCKS_HEADERS, ["seal_no"], None),
+    }
 
-def _write_csv(path: str, rows: List[Dict[str, str]], headers: List[str]) -> None:
-    with open(path, mode="w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
 
+def _backend() -> storage.StorageBackend:
+    """
+    Storage engine selected by config.STORAGE_BACKEND, created on first use.
+    """
+    global _backend_instance
 
-def _append_csv(path: str, row: Dict[str, str], headers: List[str]) -> None:
-    with open(path, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writerow(row)
+    if _backend_instance is None:
+        with _backend_lock:
+            if _backend_instance is None:
+                _backend_instance = storage.create_backend(
+                    config.STORAGE_BACKEND, _table_specs()
+                )
+    return _backend_instance
 
 
 # ---------- Accounts ----------
@@ -50,19 +80,275 @@ ACCOUNTS_HEADERS = [
 
 
 def init_accounts() -> None:
-    _ensure_file_exists(config.ACCOUNTS_CSV, ACCOUNTS_HEADERS)
+    backend = _backend()
+    backend.init_table(ACCOUNTS)
+    backend.init_table(PASSWORD_UPGRADES)
+    backend.repair_tail(PASSWORD_UPGRADES)
+
+
+# Process-level account repository keyed by account_no.
+# Balances are the accounts snapshot plus every delta in the balance
+# journal. The snapshot is re-read only when its stamp changes;
+# journal growth is applied incrementally from the last position.
+# Password hash upgrades are appended the same way and folded into the
+# snapshot by the next compaction.
+
+BALANCE_JOURNAL_HEADERS = [
+    "account_no",
+    "delta",
+    "transaction_no",
+]
+
+# Each row replaces old_hash only if the account still holds it, so rows
+# already folded into the snapshot, or overtaken by a password change,
+# are no-ops when read again.
+PASSWORD_UPGRADES_HEADERS = [
+    "account_no",
+    "old_hash",
+    "password_hash",
+]
+
+_accounts_lock = threading.RLock()
+_accounts_index: Dict[str, records.Account] = {}
+# Role and authorised projects per account, derived once per account row
+# and rebuilt with it; balance changes leave them untouched.
+_permissions: Dict[str, roles.AccountPermissions] = {}
+_accounts_stamp: Optional[storage.Stamp] = None
+_journal_stamp: Optional[storage.Stamp] = None
+_journal_offset = 0
+_journal_rows = 0
+_upgrades_stamp: Optional[storage.Stamp] = None
+_upgrades_offset = 0
+
+
+def _as_account(row: Dict[str, str]) -> records.Account:
+    # Private copy for the repository, whatever the caller passed in.
+    if isinstance(row, records.Account):
+        return row.copy()
+    return records.Account.from_row(row)
+
+
+def _apply_delta(row: records.Account, delta: str) -> None:
+    row["balance"] = money.format_paise(money.to_paise(row["balance"]) + money.to_paise(delta))
+
+
+def _apply_upgrade(row: records.Account, record: Dict[str, str]) -> None:
+    if row["password_hash"] == record["old_hash"]:
+        row["password_hash"] = record["password_hash"]
+
+
+def _journal_rewound(stamp: Optional[storage.Stamp]) -> bool:
+    if _journal_stamp is None:
+        return False
+    return stamp is None or stamp[0] != _journal_stamp[0] or stamp[2] < _journal_offset
+
+
+def _set_permissions() -> None:
+    global _permissions
+    _permissions = {no: roles.permissions_of(row) for no, row in _accounts_index.items()}
+
 
+def _load_accounts() -> Dict[str, records.Account]:
+    global _accounts_index, _accounts_stamp
+    global _journal_stamp, _journal_offset, _journal_rows
+    global _upgrades_stamp, _upgrades_offset
 
-def read_accounts() -> List[Dict[str, str]]:
-    return _read_csv(config.ACCOUNTS_CSV)
+    with _accounts_lock:
+        backend = _backend()
+        stamp = backend.stamp(ACCOUNTS)
+        journal_stamp = backend.stamp(BALANCE_JOURNAL)
+        upgrades_stamp = backend.stamp(PASSWORD_UPGRADES)
+
+        if stamp is None or stamp != _accounts_stamp or _journal_rewound(journal_stamp):
+            rows = backend.read_rows(ACCOUNTS) if stamp else []
+            _accounts_index = {row["account_no"]: row for row in rows}
+            _set_permissions()
+            _accounts_stamp = stamp
+            _journal_stamp = None
+            _journal_offset = 0
+            _journal_rows = 0
+            _upgrades_stamp = None
+            _upgrades_offset = 0
+
+        if journal_stamp is not None and journal_stamp != _journal_stamp:
+            entries, _journal_offset = backend.read_rows_from(BALANCE_JOURNAL, _journal_offset)
+            for record in entries:
+                row = _accounts_index.get(record["account_no"])
+                if row:
+                    _apply_delta(row, record["delta"])
+            _journal_rows += len(entries)
+            _journal_stamp = journal_stamp
+
+        if upgrades_stamp is not None and upgrades_stamp != _upgrades_stamp:
+            if _upgrades_stamp is not None and (
+                upgrades_stamp[0] != _upgrades_stamp[0] or upgrades_stamp[2] < _upgrades_offset
+            ):
+                _upgrades_offset = 0  # cleared by a compaction
+            entries, _upgrades_offset = backend.read_rows_from(PASSWORD_UPGRADES, _upgrades_offset)
+            for record in entries:
+                row = _accounts_index.get(record["account_no"])
+                if row:
+                    _apply_upgrade(row, record)
+            _upgrades_stamp = upgrades_stamp
+
+        return _accounts_index
+
+
+def _commit_snapshot(rows: List[Dict[str, str]]) -> None:
+    global _accounts_index, _accounts_stamp
+    global _journal_stamp, _journal_offset, _journal_rows
+    global _upgrades_stamp, _upgrades_offset
+
+    with _accounts_lock:
+        _settle_commit_log()
+        backend = _backend()
+        backend.replace_snapshot(ACCOUNTS, rows, BALANCE_JOURNAL)
+        # rows hold every upgrade; any left after a crash here are no-ops
+        backend.write_rows(PASSWORD_UPGRADES, [])
+        _settle_commit_log()
+
+        _accounts_index = {row["account_no"]: _as_account(row) for row in rows}
+        _set_permissions()
+        _accounts_stamp = backend.stamp(ACCOUNTS)
+        _journal_stamp = backend.stamp(BALANCE_JOURNAL)
+        _journal_offset = _journal_stamp[2]
+        _journal_rows = 0
+        _upgrades_stamp = backend.stamp(PASSWORD_UPGRADES)
+        _upgrades_offset = _upgrades_stamp[2]
+
+
+def read_accounts() -> List[records.Account]:
+    return [row.copy() for row in _load_accounts().values()]
+
+
+def get_account(account_no: str) -> Optional[records.Account]:
+    row = _load_accounts().get(account_no)
+    return row.copy() if row else None
+
+
+def get_account_permissions(account_no: str) -> Optional[roles.AccountPermissions]:
+    with _accounts_lock:
+        _load_accounts()
+        return _permissions.get(account_no)
 
 
 def append_account(account_row: Dict[str, str]) -> None:
-    _append_csv(config.ACCOUNTS_CSV, account_row, ACCOUNTS_HEADERS)
+    global _accounts_stamp
+
+    with _accounts_lock:
+        index = _load_accounts()
+        # Opening balance first: an orphaned one is harmless, an account
+        # without one shows up in reconciliation.
+        append_opening_balances([account_row])
+        _backend().append_rows(ACCOUNTS, [account_row])
+        index[account_row["account_no"]] = _as_account(account_row)
+        _permissions[account_row["account_no"]] = roles.permissions_of(account_row)
+        _accounts_stamp = _backend().stamp(ACCOUNTS)
 
 
 def update_accounts(rows: List[Dict[str, str]]) -> None:
-    _write_csv(config.ACCOUNTS_CSV, rows, ACCOUNTS_HEADERS)
+    _commit_snapshot(rows)
+
+
+def update_account(account_no: str, changes: Dict[str, str]) -> None:
+    """
+    Changes fields of one account (not its balance) by rewriting the
+    snapshot with the journal folded in.
+    """
+    with _accounts_lock:
+        rows = read_accounts()
+        for row in rows:
+            if row["account_no"] == account_no:
+                row.update(changes)
+                break
+        else:
+            raise ValueError("Invalid account")
+        _commit_snapshot(rows)
+
+
+def upgrade_password_hash(account_no: str, old_hash: str, password_hash: str) -> bool:
+    """
+    Replaces an account's password hash if it still holds old_hash, as one
+    appended row rather than a snapshot rewrite. Returns whether it did.
+    """
+    global _upgrades_stamp, _upgrades_offset
+
+    with _accounts_lock:
+        row = _load_accounts().get(account_no)
+        if row is None or row["password_hash"] != old_hash:
+            return False
+        record = {"account_no": account_no, "old_hash": old_hash, "password_hash": password_hash}
+        _backend().append_rows(PASSWORD_UPGRADES, [record])
+        _apply_upgrade(row, record)
+
+        _upgrades_stamp = _backend().stamp(PASSWORD_UPGRADES)
+        _upgrades_offset = _upgrades_stamp[2]
+        return True
+
+
+# ---------- Balance Journal ----------
+
+def init_balance_journal() -> None:
+    backend = _backend()
+    backend.init_table(BALANCE_JOURNAL)
+    backend.recover_snapshot(ACCOUNTS, BALANCE_JOURNAL)
+    backend.repair_tail(BALANCE_JOURNAL)
+
+
+def _balance_records(deltas: List[Tuple[str, int, str]]) -> List[Dict[str, str]]:
+    index = _load_accounts()
+    for account_no, _, _ in deltas:
+        if account_no not in index:
+            raise ValueError("Invalid account")
+
+    return [
+        {
+            "account_no": account_no,
+            "delta": money.format_paise(delta),
+            "transaction_no": transaction_no,
+        }
+        for account_no, delta, transaction_no in deltas
+    ]
+
+
+def _append_balance_records(entries: List[Dict[str, str]]) -> None:
+    global _journal_stamp, _journal_offset, _journal_rows
+
+    with _accounts_lock:
+        index = _load_accounts()
+        _backend().append_rows(BALANCE_JOURNAL, entries)
+
+        for record in entries:
+            _apply_delta(index[record["account_no"]], record["delta"])
+
+        _journal_stamp = _backend().stamp(BALANCE_JOURNAL)
+        _journal_offset = _journal_stamp[2]
+        _journal_rows += len(entries)
+
+
+def _compact_if_due() -> None:
+    with _accounts_lock:
+        if _journal_rows >= config.BALANCE_JOURNAL_COMPACT_ROWS:
+            compact_balances()
+
+
+def apply_balance_deltas(deltas: List[Tuple[str, int, str]]) -> None:
+    """
+    Records (account_no, delta in paise, transaction_no) balance changes as
+    append-only journal rows in one write. Cost is independent of the
+    number of accounts.
+    """
+    with _accounts_lock:
+        _append_balance_records(_balance_records(deltas))
+        _compact_if_due()
+
+
+def compact_balances() -> None:
+    """
+    Folds all journal deltas into the accounts snapshot and clears the journal.
+    """
+    with _accounts_lock:
+        _commit_snapshot(list(_load_accounts().values()))
 
 
 # ---------- Ledger ----------
@@ -79,19 +365,232 @@ LEDGER_HEADERS = [
 
 
 def init_ledger() -> None:
-    _ensure_file_exists(config.LEDGER_CSV, LEDGER_HEADERS)
+    _backend().init_table(LEDGER)
+
+
+def read_ledger() -> List[records.LedgerEntry]:
+    return _backend().read_rows(LEDGER)
 
 
-def read_ledger() -> List[Dict[str, str]]:
-    return _read_csv(config.LEDGER_CSV)
+def iter_ledger(start: int = 0) -> Iterator[records.LedgerEntry]:
+    return _backend().iter_rows(LEDGER, start)
+
+
+def read_ledger_by_project(project_no: str) -> List[records.LedgerEntry]:
+    return _backend().select_rows(LEDGER, "project_no", project_no)
+
+
+def get_last_ledger_row() -> Optional[records.LedgerEntry]:
+    return _backend().last_row(LEDGER)
+
+
+def transaction_number(transaction_no: str) -> int:
+    """Numeric part of a transaction_no ("T000123" -> 123), -1 if none."""
+    digits = transaction_no[1:]
+    return int(digits) if digits.isdigit() else -1
+
+
+def get_ledger_rows_after(transaction_no: Optional[str]) -> List[records.LedgerEntry]:
+    """
+    Ledger rows numbered after transaction_no (all rows for None), read
+    backwards from the tail so the cost follows the rows returned.
+    """
+    if transaction_no is None:
+        return read_ledger()
+
+    after = transaction_number(transaction_no)
+    count = 64
+    while True:
+        rows = _backend().last_rows(LEDGER, count)
+        if len(rows) < count or (rows and transaction_number(rows[0]["transaction_no"]) <= after):
+            return [row for row in rows if transaction_number(row["transaction_no"]) > after]
+        count *= 4
+
+
+def iter_ledger_between(first: str, last: str) -> Iterator[records.LedgerEntry]:
+    """Ledger rows numbered first..last inclusive, in order."""
+    low, high = transaction_number(first), transaction_number(last)
+    for row in iter_ledger():
+        number = transaction_number(row["transaction_no"])
+        if number > high:
+            return
+        if number >= low:
+            yield row
+
+
+def get_ledger_row(transaction_no: str) -> Optional[records.LedgerEntry]:
+    # The ledger is in transaction_no order, so this bisects on CSV.
+    return _backend().find_ordered(LEDGER, "transaction_no", transaction_no, transaction_number)
+
+
+def iter_ledger_by_project(
+    project_no: str,
+    after: Optional[str] = None,
+) -> Iterator[records.LedgerEntry]:
+    """
+    A project's ledger rows, only those numbered after the after
+    transaction_no if given. The ledger is in transaction_no order, so
+    the backend bisects to the first row rather than scanning to it.
+    """
+    if after is None:
+        return _backend().iter_select(LEDGER, "project_no", project_no)
+    number = transaction_number(after)
+    return _backend().iter_select_after(
+        LEDGER,
+        "project_no",
+        project_no,
+        lambda row: transaction_number(row["transaction_no"]) > number,
+    )
 
 
 def append_ledger(transaction_row: Dict[str, str]) -> None:
-    _append_csv(config.LEDGER_CSV, transaction_row, LEDGER_HEADERS)
+    append_ledger_rows([transaction_row])
+
+
+def append_ledger_rows(transaction_rows: List[Dict[str, str]]) -> None:
+    with _project_stats_lock:
+        previous = _backend().stamp(LEDGER)
+        _backend().append_rows(LEDGER, transaction_rows)
+        _project_stats_changed(previous, transaction_rows, [])
+
+
+def update_ledger(rows: List[Dict[str, str]], verified: Optional[List[Dict[str, str]]] = None) -> None:
+    """
+    Rewrites the ledger. verified lists the rows whose status changed to
+    done, letting project aggregates be updated in place; any other
+    rewrite makes them rebuild on next read.
+    """
+    with _project_stats_lock:
+        _settle_commit_log()
+        previous = _backend().stamp(LEDGER)
+        _backend().write_rows(LEDGER, rows)
+        _project_stats_changed(previous, [], verified)
+        _settle_commit_log()
+
+
+# ---------- Balance History ----------
+
+# Running balance of an account after each transaction that moved it,
+# written with the ledger. An account's rows are in transaction order,
+# so point-in-time lookups binary-search them instead of replaying the
+# ledger.
+
+BALANCE_HISTORY_HEADERS = [
+    "account_no",
+    "transaction_no",
+    "timestamp",
+    "delta",
+    "balance",
+]
+
+
+def init_balance_history() -> None:
+    _backend().init_table(BALANCE_HISTORY)
+
+
+def normalize_timestamp(timestamp: str) -> str:
+    """
+    Fixed-width UTC form of an ISO timestamp (naive means UTC), so
+    history timestamps order correctly as strings.
+    """
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _history_row(account_no: str, ledger_row: Dict[str, str], delta: int, balance: int) -> Dict[str, str]:
+    return {
+        "account_no": account_no,
+        "transaction_no": ledger_row["transaction_no"],
+        "timestamp": normalize_timestamp(ledger_row["timestamp"]),
+        "delta": money.format_paise(delta),
+        "balance": money.format_paise(balance),
+    }
+
+
+def _history_records(
+    deltas: List[Tuple[str, int, str]],
+    ledger_rows: List[Dict[str, str]],
+) -> List[Dict[str, str]]:
+    """History rows for deltas about to be applied on top of current balances."""
+    index = _load_accounts()
+    by_transaction = {row["transaction_no"]: row for row in ledger_rows}
+    balances: Dict[str, int] = {}
+
+    entries = []
+    for account_no, delta, transaction_no in deltas:
+        if account_no not in balances:
+            balances[account_no] = money.to_paise(index[account_no]["balance"])
+        balances[account_no] += delta
+        entries.append(_history_row(account_no, by_transaction[transaction_no], delta, balances[account_no]))
+    return entries
+
+
+def append_balance_history(entries: List[Dict[str, str]]) -> None:
+    _backend().append_rows(BALANCE_HISTORY, entries)
+
 
+def get_balance_history(account_no: str) -> List[Dict[str, str]]:
+    return _backend().select_rows(BALANCE_HISTORY, "account_no", account_no)
 
-def update_ledger(rows: List[Dict[str, str]]) -> None:
-    _write_csv(config.LEDGER_CSV, rows, LEDGER_HEADERS)
+
+def _opening_from_current() -> Dict[str, int]:
+    """Opening balances in paise: current balances with every ledger movement undone."""
+    balances = {no: money.to_paise(row["balance"]) for no, row in _load_accounts().items()}
+    for tx in iter_ledger():
+        amount = money.to_paise(tx["amount"])
+        if tx["from_account_no"] in balances:
+            balances[tx["from_account_no"]] += amount
+        if tx["to_account_no"] in balances:
+            balances[tx["to_account_no"]] -= amount
+    return balances
+
+
+# Rows written per append while rebuilding, to bound memory.
+_REBUILD_CHUNK_ROWS = 50_000
+
+
+def _rebuild_balance_history() -> int:
+    with _accounts_lock:
+        balances = _opening_from_current()
+        _backend().write_rows(BALANCE_HISTORY, [])
+
+        written = 0
+        entries = []
+        for tx in iter_ledger():
+            amount = money.to_paise(tx["amount"])
+            for account_no, delta in ((tx["from_account_no"], -amount), (tx["to_account_no"], amount)):
+                if account_no in balances:
+                    balances[account_no] += delta
+                    entries.append(_history_row(account_no, tx, delta, balances[account_no]))
+
+            if len(entries) >= _REBUILD_CHUNK_ROWS:
+                append_balance_history(entries)
+                written += len(entries)
+                entries = []
+
+        if entries:
+            append_balance_history(entries)
+        return written + len(entries)
+
+
+def rebuild_balance_history() -> int:
+    """
+    Recreates the balance history from the ledger, working opening
+    balances back from current ones. Returns the number of rows written.
+    """
+    with storage.file_lock(config.WRITER_LOCK):
+        return _rebuild_balance_history()
+
+
+def _backfill_balance_history() -> None:
+    # Ledgers from before the history existed are replayed once.
+    backend = _backend()
+    if backend.last_row(BALANCE_HISTORY) is None and backend.last_row(LEDGER) is not None:
+        with storage.file_lock(config.WRITER_LOCK):
+            if backend.last_row(BALANCE_HISTORY) is None:
+                _rebuild_balance_history()
 
 
 # ---------- Blockchain ----------
@@ -104,16 +603,373 @@ BLOCKCHAIN_HEADERS = [
 ]
 
 
+# Chain tip (last transaction_no and hash), kept in memory so appending
+# a block never reads the whole chain. On a stamp mismatch it is re-read
+# from the last block, a backwards seek rather than a scan.
+_chain_tip_lock = threading.RLock()
+_chain_tip: Optional[Dict[str, str]] = None
+_chain_tip_stamp: Optional[storage.Stamp] = None
+
+
+def _tip_of(block_row: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if block_row is None:
+        return None
+    return {
+        "transaction_no": block_row["transaction_no"],
+        "current_hash": block_row["current_hash"],
+    }
+
+
+# Binary mirror of the chain (chainfile.py) that block reads go through.
+# It is rebuilt whenever the table changed other than by our appends; if
+# it cannot hold the table (e.g. a hash that is not hex) reads fall back
+# to the backend until the table changes again.
+_chain_file_lock = threading.Lock()
+_chain_file_instance: Optional[chainfile.ChainFile] = None
+_chain_file_failed: Optional[storage.Stamp] = None
+
+
+def _chain_file() -> Optional[chainfile.ChainFile]:
+    global _chain_file_instance, _chain_file_failed
+
+    with _chain_file_lock:
+        if _chain_file_instance is None:
+            _chain_file_instance = chainfile.ChainFile(config.BLOCKCHAIN_BIN)
+        chain = _chain_file_instance
+
+        stamp = _backend().stamp(BLOCKCHAIN)
+        if chain.in_sync(stamp):
+            return chain
+        if stamp is None or stamp == _chain_file_failed:
+            return None
+        try:
+            chain.sync(_backend(), BLOCKCHAIN)
+        except (ValueError, UnicodeError):
+            _chain_file_failed = stamp
+            return None
+        return chain if chain.in_sync(_backend().stamp(BLOCKCHAIN)) else None
+
+
 def init_blockchain() -> None:
-    _ensure_file_exists(config.BLOCKCHAIN_CSV, BLOCKCHAIN_HEADERS)
+    _backend().init_table(BLOCKCHAIN)
+    get_chain_tip()
+    _chain_file()
 
 
-def read_blockchain() -> List[Dict[str, str]]:
-    return _read_csv(config.BLOCKCHAIN_CSV)
+def read_blockchain() -> List[records.Block]:
+    return list(iter_blockchain())
+
+
+def get_block(transaction_no: str) -> Optional[records.Block]:
+    chain = _chain_file()
+    if chain is not None:
+        return chain.find(transaction_no)
+    rows = _backend().select_rows(BLOCKCHAIN, "transaction_no", transaction_no)
+    return rows[0] if rows else None
+
+
+def get_blocks(transaction_nos: List[str]) -> Dict[str, records.Block]:
+    """Blocks for the given transaction numbers, keyed by number."""
+    wanted = set(transaction_nos)
+    chain = _chain_file()
+    if chain is not None:
+        found = [chain.find(transaction_no) for transaction_no in wanted]
+    else:
+        found = [b for b in _backend().iter_rows(BLOCKCHAIN) if b["transaction_no"] in wanted]
+    return {block["transaction_no"]: block for block in found if block is not None}
+
+
+def iter_blockchain(start: int = 0) -> Iterator[records.Block]:
+    chain = _chain_file()
+    if chain is not None:
+        return chain.iter_blocks(start)
+    return _backend().iter_rows(BLOCKCHAIN, start)
+
+
+def export_blockchain_csv(path: str) -> int:
+    """
+    Writes the chain, as read through the binary mirror, in the
+    blockchain.csv layout. Returns the number of blocks.
+    """
+    chain = _chain_file()
+    if chain is None:
+        raise ValueError("Chain file unavailable; blockchain table holds non-standard rows")
+    return chain.export_csv(path, BLOCKCHAIN_HEADERS)
+
+
+def get_chain_tip() -> Optional[Dict[str, str]]:
+    """
+    Returns {"transaction_no", "current_hash"} of the last block,
+    or None for an empty chain.
+    """
+    global _chain_tip, _chain_tip_stamp
+
+    with _chain_tip_lock:
+        stamp = _backend().stamp(BLOCKCHAIN)
+        if stamp != _chain_tip_stamp:
+            # Written by someone else since we last looked.
+            _chain_tip = _tip_of(_backend().last_row(BLOCKCHAIN))
+            _chain_tip_stamp = stamp
+        return dict(_chain_tip) if _chain_tip else None
 
 
 def append_blockchain(block_row: Dict[str, str]) -> None:
-    _append_csv(config.BLOCKCHAIN_CSV, block_row, BLOCKCHAIN_HEADERS)
+    append_blockchain_rows([block_row])
+
+
+def append_blockchain_rows(block_rows: List[Dict[str, str]]) -> None:
+    global _chain_tip, _chain_tip_stamp
+
+    if not block_rows:
+        return  # sealing mode: transactions wait for a sealed block
+
+    with _chain_tip_lock:
+        previous = _backend().stamp(BLOCKCHAIN)
+        _backend().append_rows(BLOCKCHAIN, block_rows)
+        _chain_tip = _tip_of(block_rows[-1])
+        _chain_tip_stamp = _backend().stamp(BLOCKCHAIN)
+
+        # Keep the binary mirror in step; if it was not, the next read
+        # rebuilds it.
+        if _chain_file_instance is not None and previous is not None:
+            try:
+                _chain_file_instance.append(block_rows, previous, _chain_tip_stamp)
+            except (ValueError, UnicodeError):
+                pass
+
+        _merkle_appended(block_rows, previous, _chain_tip_stamp)
+
+
+# ---------- Merkle Trees ----------
+
+# A Merkle tree over every block, and one per project, with
+# leaf = merkle.leaf_hash(block current_hash). Built from the chain on
+# first use in a process and extended as blocks are appended; any other
+# change to the chain rebuilds them. Leaves are in chain order, so a
+# transaction's leaf index is found by bisecting its number.
+
+class _MerkleIndex:
+    """A tree plus the transaction number of each of its leaves."""
+
+    def __init__(self):
+        self.tree = merkle.MerkleTree()
+        self.numbers = array("q")
+
+    def add(self, block: Dict[str, str]) -> None:
+        self.numbers.append(transaction_number(block["transaction_no"]))
+        self.tree.append(merkle.leaf_hash(block["current_hash"]))
+
+    def position(self, transaction_no: str) -> Optional[int]:
+        number = transaction_number(transaction_no)
+        if number < 0:
+            return None
+        i = bisect_left(self.numbers, number)
+        if i < len(self.numbers) and self.numbers[i] == number:
+            return i
+        try:
+            return self.numbers.index(number)  # chain not in number order
+        except ValueError:
+            return None
+
+    def size_at(self, number: int) -> int:
+        """Leaves up to and including transaction number."""
+        return bisect_right(self.numbers, number)
+
+    def proof(self, index: int, size: Optional[int] = None) -> Dict[str, object]:
+        size = len(self.tree) if size is None else size
+        return {
+            "index": index,
+            "size": size,
+            "root": self.tree.root(size),
+            "path": self.tree.proof(index, size),
+        }
+
+
+_merkle_lock = threading.RLock()
+_merkle_global = _MerkleIndex()
+_merkle_projects: Dict[str, _MerkleIndex] = {}
+_merkle_stamp: Optional[storage.Stamp] = None
+
+
+def _merkle_add(block: Dict[str, str]) -> None:
+    _merkle_global.add(block)
+    project = _merkle_projects.get(block["project_no"])
+    if project is None:
+        project = _merkle_projects[block["project_no"]] = _MerkleIndex()
+    project.add(block)
+
+
+def _sync_merkle_trees() -> None:
+    global _merkle_global, _merkle_projects, _merkle_stamp
+
+    with _merkle_lock:
+        stamp = _backend().stamp(BLOCKCHAIN)
+        if stamp is not None and stamp == _merkle_stamp:
+            return
+
+        _merkle_global = _MerkleIndex()
+        _merkle_projects = {}
+        for block in iter_blockchain():
+            _merkle_add(block)
+        _merkle_stamp = stamp
+
+
+def _merkle_appended(
+    block_rows: List[Dict[str, str]],
+    previous: Optional[storage.Stamp],
+    stamp: Optional[storage.Stamp],
+) -> None:
+    global _merkle_stamp
+
+    with _merkle_lock:
+        # Trees not built yet, or behind: the next read rebuilds them.
+        if previous is None or previous != _merkle_stamp:
+            return
+        for block in block_rows:
+            _merkle_add(block)
+        _merkle_stamp = stamp
+
+
+def get_merkle_roots() -> Dict[str, object]:
+    """{"global": {size, root}, "projects": {project_no: {size, root}}}"""
+    with _merkle_lock:
+        _sync_merkle_trees()
+        return {
+            "global": {"size": len(_merkle_global.tree), "root": _merkle_global.tree.root()},
+            "projects": {
+                project_no: {"size": len(index.tree), "root": index.tree.root()}
+                for project_no, index in sorted(_merkle_projects.items())
+            },
+        }
+
+
+def get_merkle_proof(
+    transaction_no: str,
+    project_no: str,
+    size: Optional[int] = None,
+) -> Optional[Dict[str, Dict[str, object]]]:
+    """
+    Audit paths for a transaction's block in the global tree and in its
+    project's tree: {"global": {index, size, root, path}, "project": {...}},
+    or None if the block is not in them.
+
+    size proves against the global tree as it was with that many leaves
+    (a root published earlier), and the project tree as it was then;
+    the current trees by default. Raises ValueError if the block is not
+    among the first size leaves.
+    """
+    with _merkle_lock:
+        _sync_merkle_trees()
+        project = _merkle_projects.get(project_no)
+        global_index = _merkle_global.position(transaction_no)
+        project_index = project.position(transaction_no) if project else None
+        if global_index is None or project_index is None:
+            return None
+
+        project_size = None
+        if size is not None:
+            if not global_index < size <= len(_merkle_global.tree):
+                raise ValueError("Tree size out of range")
+            project_size = project.size_at(_merkle_global.numbers[size - 1])
+        return {
+            "global": _merkle_global.proof(global_index, size),
+            "project": project.proof(project_index, project_size),
+        }
+
+
+# ---------- Sealed Blocks ----------
+
+# One block for a run of transactions (config.BLOCK_SEALING): the Merkle
+# root of their transactions, chained to the previous sealed block. The
+# first sealed block links to the per-transaction chain tip. Seals cover
+# consecutive ledger rows in number order, so the seal holding a
+# transaction is found by bisecting the (small) list of seals.
+
+SEALED_BLOCKS_HEADERS = [
+    "seal_no",
+    "first_transaction_no",
+    "last_transaction_no",
+    "transaction_count",
+    "merkle_root",
+    "sealed_at",
+    "previous_hash",
+    "current_hash",
+]
+
+_seals_lock = threading.RLock()
+_seals: List[Dict[str, str]] = []
+_seal_ends = array("q")
+_seals_stamp: Optional[storage.Stamp] = None
+
+
+def init_sealed_blocks() -> None:
+    _backend().init_table(SEALED_BLOCKS)
+
+
+def read_sealed_blocks() -> List[Dict[str, str]]:
+    global _seals, _seal_ends, _seals_stamp
+
+    with _seals_lock:
+        stamp = _backend().stamp(SEALED_BLOCKS)
+        if stamp != _seals_stamp:
+            _seals = _backend().read_rows(SEALED_BLOCKS)
+            _seal_ends = array("q", (transaction_number(s["last_transaction_no"]) for s in _seals))
+            _seals_stamp = stamp
+        return _seals
+
+
+def get_seal_tip() -> Optional[Dict[str, str]]:
+    seals = read_sealed_blocks()
+    return seals[-1] if seals else None
+
+
+def find_seal(transaction_no: str) -> Optional[Dict[str, str]]:
+    """The sealed block covering a transaction, if any."""
+    with _seals_lock:
+        seals = read_sealed_blocks()
+        number = transaction_number(transaction_no)
+        i = bisect_left(_seal_ends, number)
+        if i < len(seals) and transaction_number(seals[i]["first_transaction_no"]) <= number:
+            return seals[i]
+        return None
+
+
+def get_seal_ranges() -> Tuple[List[Dict[str, str]], array, array]:
+    """
+    The sealed blocks with the first and last transaction number of each,
+    as copies taken together, for callers bisecting many numbers.
+    """
+    with _seals_lock:
+        seals = read_sealed_blocks()
+        firsts = array("q", (transaction_number(s["first_transaction_no"]) for s in seals))
+        return seals, firsts, array("q", _seal_ends)
+
+
+def append_sealed_block(seal_row: Dict[str, str]) -> None:
+    _backend().append_rows(SEALED_BLOCKS, [seal_row])
+
+
+# ---------- Chain Audit Checkpoints ----------
+
+CHAIN_CHECKPOINTS_HEADERS = [
+    "height",
+    "transaction_no",
+    "current_hash",
+    "created_at",
+    "signature",
+]
+
+
+def init_chain_checkpoints() -> None:
+    _backend().init_table(CHAIN_CHECKPOINTS)
+
+
+def get_last_chain_checkpoint() -> Optional[Dict[str, str]]:
+    return _backend().last_row(CHAIN_CHECKPOINTS)
+
+
+def append_chain_checkpoint(checkpoint_row: Dict[str, str]) -> None:
+    _backend().append_rows(CHAIN_CHECKPOINTS, [checkpoint_row])
 
 
 # ---------- Project Descriptions ----------
@@ -125,26 +981,678 @@ PROJECT_DIS_HEADERS = [
 
 
 def init_project_dis() -> None:
-    _ensure_file_exists(config.PROJECT_DIS_CSV, PROJECT_DIS_HEADERS)
+    _backend().init_table(PROJECT_DIS)
 
 
-def read_project_dis() -> List[Dict[str, str]]:
-    return _read_csv(config.PROJECT_DIS_CSV)
+def read_project_dis() -> List[records.Project]:
+    return _backend().read_rows(PROJECT_DIS)
 
 
 def append_project_dis(project_row: Dict[str, str]) -> None:
-    _append_csv(config.PROJECT_DIS_CSV, project_row, PROJECT_DIS_HEADERS)
+    _backend().append_rows(PROJECT_DIS, [project_row])
+
+
+# ---------- Project Aggregates ----------
+
+PROJECT_STATS_HEADERS = [
+    "project_no",
+    "total_disbursed",
+    "transaction_count",
+    "pending_count",
+    "done_count",
+    "beneficiary_count",
+    "last_activity",
+    "ledger_stamp",
+]
+
+PROJECT_BENEFICIARIES_HEADERS = [
+    "project_no",
+    "account_no",
+]
+
+# Totals per project, kept in memory and mirrored to a sidecar next to
+# project_dis.csv. They are tagged with the ledger stamp they describe:
+# appends and verification update them in place, anything else (another
+# process, crash recovery, a hand edit) makes the next read rebuild them
+# with one pass over the ledger.
+#
+# Beneficiary sets go to their own append-only sidecar, one row per new
+# (project, account) pair, and the small totals file is rewritten once
+# per writer group (flush_project_stats), not per ledger write.
+_project_stats_lock = threading.RLock()
+_project_stats: Dict[str, Dict[str, object]] = {}
+_project_stats_stamp: Optional[storage.Stamp] = None
+_project_stats_dirty = False
+
+
+def _empty_stats() -> Dict[str, object]:
+    return {
+        "total": 0,
+        "count": 0,
+        "pending": 0,
+        "done": 0,
+        "beneficiaries": set(),
+        "last_activity": "",
+    }
+
+
+def _add_to_stats(stats: Dict[str, Dict[str, object]], tx: Dict[str, str]) -> bool:
+    """Adds a ledger row; returns True if it brings a new beneficiary."""
+    project = stats.setdefault(tx["project_no"], _empty_stats())
+    project["total"] += money.to_paise(tx["amount"])
+    project["count"] += 1
+    if tx["verification_status"] == config.VERIFICATION_DONE:
+        project["done"] += 1
+    else:
+        project["pending"] += 1
+    project["last_activity"] = max(project["last_activity"], normalize_timestamp(tx["timestamp"]))
+
+    if tx["to_account_no"] in project["beneficiaries"]:
+        return False
+    project["beneficiaries"].add(tx["to_account_no"])
+    return True
+
+
+def _stamp_text(stamp: Optional[storage.Stamp]) -> str:
+    return "-".join(map(str, stamp)) if stamp else ""
+
+
+def _save_project_stats() -> None:
+    global _project_stats_dirty
+
+    stamp = _stamp_text(_project_stats_stamp)
+    rows = [
+        {
+            "project_no": project_no,
+            "total_disbursed": money.format_paise(project["total"]),
+            "transaction_count": str(project["count"]),
+            "pending_count": str(project["pending"]),
+            "done_count": str(project["done"]),
+            "beneficiary_count": str(len(project["beneficiaries"])),
+            "last_activity": project["last_activity"],
+            "ledger_stamp": stamp,
+        }
+        for project_no, project in sorted(_project_stats.items())
+    ]
+    # Only a hint: checked against the ledger stamp when loaded.
+    storage.write_csv(config.PROJECT_STATS_CSV, rows, PROJECT_STATS_HEADERS, durable=False)
+    _project_stats_dirty = False
+
+
+def _save_project_beneficiaries() -> None:
+    rows = [
+        {"project_no": project_no, "account_no": account_no}
+        for project_no, project in sorted(_project_stats.items())
+        for account_no in sorted(project["beneficiaries"])
+    ]
+    storage.write_csv(
+        config.PROJECT_BENEFICIARIES_CSV, rows, PROJECT_BENEFICIARIES_HEADERS, durable=False
+    )
+
+
+def _load_saved_project_stats(stamp: storage.Stamp) -> bool:
+    global _project_stats, _project_stats_stamp
+
+    if not (os.path.exists(config.PROJECT_STATS_CSV) and os.path.exists(config.PROJECT_BENEFICIARIES_CSV)):
+        return False
+    rows = storage.read_csv(config.PROJECT_STATS_CSV)
+    try:
+        if not rows or any(row["ledger_stamp"] != _stamp_text(stamp) for row in rows):
+            return False
+        stats = {
+            row["project_no"]: {
+                "total": money.to_paise(row["total_disbursed"]),
+                "count": int(row["transaction_count"]),
+                "pending": int(row["pending_count"]),
+                "done": int(row["done_count"]),
+                "beneficiaries": set(),
+                "last_activity": row["last_activity"],
+            }
+            for row in rows
+        }
+        for row in storage.read_csv(config.PROJECT_BENEFICIARIES_CSV):
+            stats[row["project_no"]]["beneficiaries"].add(row["account_no"])
+        # Pairs appended for ledger rows the totals never caught up with.
+        if any(len(stats[row["project_no"]]["beneficiaries"]) != int(row["beneficiary_count"]) for row in rows):
+            return False
+    except (KeyError, TypeError, ValueError):
+        return False
+
+    _project_stats = stats
+    _project_stats_stamp = stamp
+    return True
+
+
+def _rebuild_project_stats() -> None:
+    global _project_stats, _project_stats_stamp
+
+    stamp = _backend().stamp(LEDGER)
+    stats: Dict[str, Dict[str, object]] = {}
+    for tx in iter_ledger():
+        _add_to_stats(stats, tx)
+
+    _project_stats = stats
+    _project_stats_stamp = stamp
+    _save_project_beneficiaries()
+    _save_project_stats()
+
+
+def _sync_project_stats() -> Dict[str, Dict[str, object]]:
+    with _project_stats_lock:
+        stamp = _backend().stamp(LEDGER)
+        if stamp is None or stamp != _project_stats_stamp:
+            if stamp is None or not _load_saved_project_stats(stamp):
+                _rebuild_project_stats()
+        return _project_stats
+
+
+def _project_stats_changed(
+    previous: Optional[storage.Stamp],
+    appended: List[Dict[str, str]],
+    verified: Optional[List[Dict[str, str]]],
+) -> None:
+    """
+    Applies a ledger write to the aggregates if they described the
+    ledger just before it; otherwise leaves them to be rebuilt.
+    """
+    global _project_stats_stamp, _project_stats_dirty
+
+    if previous is None or previous != _project_stats_stamp or verified is None:
+        return
+
+    new_beneficiaries = [
+        {"project_no": tx["project_no"], "account_no": tx["to_account_no"]}
+        for tx in appended
+        if _add_to_stats(_project_stats, tx)
+    ]
+    for tx in verified:
+        project = _project_stats.get(tx["project_no"])
+        if project is None or project["pending"] == 0:
+            _project_stats_stamp = None
+            return
+        project["pending"] -= 1
+        project["done"] += 1
+
+    _project_stats_stamp = _backend().stamp(LEDGER)
+    _project_stats_dirty = True
+    if new_beneficiaries:
+        storage.append_csv(
+            config.PROJECT_BENEFICIARIES_CSV, new_beneficiaries, PROJECT_BENEFICIARIES_HEADERS, durable=False
+        )
+
+
+def flush_project_stats() -> None:
+    """Writes the totals sidecar if the ledger changed since it was last written."""
+    with _project_stats_lock:
+        if _project_stats_dirty and _project_stats_stamp is not None:
+            _save_project_stats()
+
+
+def init_project_stats() -> None:
+    _sync_project_stats()
+
+
+def get_project_stats() -> Dict[str, Dict[str, str]]:
+    """
+    {project_no: {total_disbursed, transaction_count, pending_count,
+    done_count, beneficiary_count, last_activity}} for projects with
+    transactions.
+    """
+    with _project_stats_lock:
+        return {
+            project_no: {
+                "total_disbursed": money.format_paise(project["total"]),
+                "transaction_count": project["count"],
+                "pending_count": project["pending"],
+                "done_count": project["done"],
+                "beneficiary_count": len(project["beneficiaries"]),
+                "last_activity": project["last_activity"],
+            }
+            for project_no, project in _sync_project_stats().items()
+        }
+
+
+def rebuild_project_stats() -> int:
+    """Recomputes the aggregates from the ledger. Returns the number of projects."""
+    with _project_stats_lock:
+        _rebuild_project_stats()
+        return len(_project_stats)
+
+
+# ---------- Change Tracking ----------
+
+# Every table an API response can depend on: the ledger and chain, seals
+# (proofs, seal status), projects, and balances with their history.
+VERSIONED_TABLES = (
+    LEDGER,
+    BLOCKCHAIN,
+    SEALED_BLOCKS,
+    PROJECT_DIS,
+    ACCOUNTS,
+    BALANCE_JOURNAL,
+    BALANCE_HISTORY,
+)
+
+
+def data_version() -> str:
+    """
+    Opaque token that changes whenever any of VERSIONED_TABLES changes.
+    It starts with the chain tip hash.
+    """
+    tip = get_chain_tip()
+    backend = _backend()
+    stamps = [backend.stamp(table) for table in VERSIONED_TABLES]
+    digest = hashlib.sha256(repr(stamps).encode("utf-8")).hexdigest()[:16]
+    return f'{tip["current_hash"] if tip else "GENESIS"}-{digest}'
+
+
+def last_modified() -> Optional[float]:
+    backend = _backend()
+    times = [backend.modified_time(table) for table in VERSIONED_TABLES]
+    times = [t for t in times if t is not None]
+    return max(times) if times else None
+
+
+# ---------- Opening Balances ----------
+
+# The balance each account was created with. Balances are otherwise only
+# changed by the ledger, so opening balance + net ledger flow must equal
+# the current balance (see audit.reconcile_balances).
+# source is OPENING_RECORDED for balances written at account creation and
+# OPENING_DERIVED for those worked back from current balances on upgrade,
+# which reconcile by construction and are reported separately.
+
+OPENING_BALANCES_HEADERS = [
+    "account_no",
+    "balance",
+    "source",
+]
+
+OPENING_RECORDED = "recorded"
+OPENING_DERIVED = "derived"
+
+
+def init_opening_balances() -> None:
+    _backend().init_table(OPENING_BALANCES)
+
+
+def read_opening_balances() -> Dict[str, str]:
+    return {row["account_no"]: row["balance"] for row in _backend().iter_rows(OPENING_BALANCES)}
+
+
+def read_derived_openings() -> Set[str]:
+    """Accounts whose opening balance was derived rather than recorded."""
+    return {
+        row["account_no"]
+        for row in _backend().iter_rows(OPENING_BALANCES)
+        if row.get("source") == OPENING_DERIVED
+    }
+
+
+def append_opening_balances(account_rows: List[Dict[str, str]]) -> None:
+    _backend().append_rows(
+        OPENING_BALANCES,
+        [
+            {
+                "account_no": row["account_no"],
+                "balance": money.canonical(row["balance"]),
+                "source": OPENING_RECORDED,
+            }
+            for row in account_rows
+        ],
+    )
+
+
+def _backfill_opening_balances() -> None:
+    """
+    Accounts from before opening balances were recorded get one worked
+    back from their current balance, marked OPENING_DERIVED. Drift from
+    before the upgrade cannot show up as a mismatch, so reconciliation
+    lists these accounts instead.
+    """
+    backend = _backend()
+    if backend.last_row(OPENING_BALANCES) is not None or backend.last_row(ACCOUNTS) is None:
+        return
+
+    with storage.file_lock(config.WRITER_LOCK):
+        if backend.last_row(OPENING_BALANCES) is not None:
+            return
+        with _accounts_lock:
+            balances = _opening_from_current()
+            backend.write_rows(
+                OPENING_BALANCES,
+                [
+                    {"account_no": no, "balance": money.format_paise(paise), "source": OPENING_DERIVED}
+                    for no, paise in balances.items()
+                ],
+            )
+
+
+# ---------- Commit Log ----------
+
+# A transaction touches the balance journal, ledger, balance history and
+# blockchain.
+# Its rows are logged to config.COMMIT_LOG before any table is written,
+# so a crash part-way through is redone from the log on startup.
+# Rows are matched against each table's tail by these columns.
+#
+# Under "group" durability the records are not synced one by one.
+# Instead each commit_group() leaves the log holding the marks() of every
+# table, synced once, and a crash before the next commit_group() rolls
+# the tables back to them: nothing after the marks was acknowledged.
+COMMIT_LOG_KEYS = {
+    BALANCE_JOURNAL: ("account_no", "transaction_no"),
+    LEDGER: ("transaction_no",),
+    BALANCE_HISTORY: ("account_no", "transaction_no"),
+    BLOCKCHAIN: ("transaction_no",),
+}
+
+
+LogMarks = Dict[str, List[int]]
+
+# Marks the log holds with no records after them, if any.
+_log_marks: Optional[LogMarks] = None
+
+
+def _log_checksum(body: object) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _write_commit_log(tables: Dict[str, List[Dict[str, str]]]) -> None:
+    global _log_marks
+
+    line = json.dumps({"tables": tables, "checksum": _log_checksum(tables)}) + "\n"
+    with open(config.COMMIT_LOG, mode="ab") as f:
+        f.write(line.encode("utf-8"))
+        f.flush()
+        # The log must be on disk before any table it describes; under
+        # "group" the marks already synced at its head stand in for it.
+        if config.WRITE_DURABILITY == storage.DURABILITY_ALWAYS:
+            os.fsync(f.fileno())
+    _log_marks = None
+
+
+def _read_commit_log() -> Tuple[Optional[LogMarks], List[Dict[str, List[Dict[str, str]]]]]:
+    """
+    Returns the table marks at the head of the log, if any, and the
+    logged transactions. A torn or corrupt record ends the log: its
+    tables were never written, so it is dropped (rolled back).
+    """
+    if not os.path.exists(config.COMMIT_LOG):
+        return None, []
+
+    marks = None
+    entries = []
+    with open(config.COMMIT_LOG, mode="rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            kind = "marks" if "marks" in record else "tables"
+            if not line.endswith(b"\n") or record.get("checksum") != _log_checksum(record.get(kind)):
+                break
+            if kind == "marks":
+                marks = record["marks"]
+            else:
+                entries.append(record["tables"])
+    return marks, entries
+
+
+def _reset_commit_log() -> None:
+    """
+    Empties the log once what it covers is durable. Under "group"
+    durability it is left holding the marks of every table, synced: the
+    point a crash before the next reset rolls back to.
+    """
+    global _log_marks
+
+    if config.WRITE_DURABILITY != storage.DURABILITY_GROUP:
+        _log_marks = None
+        if os.path.exists(config.COMMIT_LOG) and os.path.getsize(config.COMMIT_LOG):
+            open(config.COMMIT_LOG, mode="wb").close()
+        return
+
+    # Marks may only cover rows already on disk.
+    _backend().sync()
+    marks = _backend().marks()
+    if marks == _log_marks:
+        return
+    line = json.dumps({"marks": marks, "checksum": _log_checksum(marks)}) + "\n"
+    with open(config.COMMIT_LOG, mode="wb") as f:
+        f.write(line.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    _log_marks = marks
+
+
+# Set when applying a logged transaction failed part-way; the log is then
+# kept until recover_commit_log() succeeds.
+_commit_incomplete = False
+
+
+def _settle_commit_log() -> None:
+    """
+    Called around rewrites of logged tables (folding the journal into a
+    snapshot, rewriting the ledger): logged rows are made durable (or
+    redone first) so the log can be dropped, and under "group" the marks
+    are taken again past the rewrite.
+    """
+    if _commit_incomplete:
+        recover_commit_log()
+    _backend().sync()
+    _reset_commit_log()
+
+
+def _finish_commit() -> None:
+    if _commit_incomplete:
+        return
+    # Compaction folds journal rows into the snapshot, so it only runs
+    # once no logged transaction can still need redoing.
+    _reset_commit_log()
+    _compact_if_due()
+
+
+def commit_transactions(
+    deltas: List[Tuple[str, int, str]],
+    ledger_rows: List[Dict[str, str]],
+    block_rows: List[Dict[str, str]],
+) -> None:
+    """
+    Writes balance deltas, ledger rows, balance history and blocks for a
+    set of transactions as one crash-consistent unit: logged first, then
+    applied table by table. Under the "group" durability policy the log is
+    reset by commit_group() once the tables are synced.
+    """
+    with _accounts_lock:
+        entries = _balance_records(deltas)
+        history = _history_records(deltas, ledger_rows)
+        _write_commit_log({
+            BALANCE_JOURNAL: entries,
+            LEDGER: ledger_rows,
+            BALANCE_HISTORY: history,
+            BLOCKCHAIN: block_rows,
+        })
+
+        try:
+            _append_balance_records(entries)
+            append_ledger_rows(ledger_rows)
+            append_balance_history(history)
+            append_blockchain_rows(block_rows)
+        except BaseException:
+            _recover_after_failure()
+            raise
+
+        if config.WRITE_DURABILITY != storage.DURABILITY_GROUP:
+            _finish_commit()
+
+
+def _redo_tail(table: str, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Returns the logged rows missing from the table. Tables are append-only
+    and written in log order, so the rows present are a prefix of the
+    logged ones sitting at the table's tail.
+    """
+    key = COMMIT_LOG_KEYS[table]
+    logged = [tuple(row[c] for c in key) for row in rows]
+    tail = [tuple(row[c] for c in key) for row in _backend().last_rows(table, len(rows))]
+
+    present = len(logged)
+    while present and tail[max(len(tail) - present, 0):] != logged[:present]:
+        present -= 1
+    return rows[present:]
+
+
+def _recover_after_failure() -> None:
+    global _commit_incomplete
+
+    _commit_incomplete = True
+    try:
+        recover_commit_log()
+    except Exception:
+        pass  # the log is kept; init_all() retries on next startup
+
+
+def recover_commit_log(rollback: bool = False) -> Dict[str, int]:
+    """
+    Redoes logged transactions a crash left partly applied and returns
+    the number of rows restored per table. Only the log and as many rows
+    from each table's tail are read, so the cost follows the log size.
+
+    With rollback=True (on startup), a log headed by "group" marks
+    instead cuts every table back to them: the rows after the marks were
+    never synced or acknowledged, so the group is dropped as a whole.
+    """
+    global _commit_incomplete
+
+    marks, entries = _read_commit_log()
+    restored = {table: 0 for table in COMMIT_LOG_KEYS}
+    backend = _backend()
+
+    if rollback and marks is not None:
+        backend.rollback(marks)
+        for table in COMMIT_LOG_KEYS:
+            backend.repair_tail(table)
+        entries = []
+
+    if entries:
+        for table in COMMIT_LOG_KEYS:
+            backend.repair_tail(table)
+            rows = [row for entry in entries for row in entry.get(table, [])]
+            missing = _redo_tail(table, rows) if rows else []
+            if not missing:
+                continue
+            if table == BLOCKCHAIN:
+                append_blockchain_rows(missing)
+            else:
+                backend.append_rows(table, missing)
+            restored[table] = len(missing)
+        backend.sync()
+
+    _commit_incomplete = False
+    _finish_commit()
+    return restored
+
+
+# ---------- Group Commit ----------
+
+def commit_group() -> None:
+    """
+    Makes every append since the last call durable, as set by
+    config.WRITE_DURABILITY. The writer calls this once per group of
+    queued writes, before answering any of them.
+    """
+    _backend().sync()
+    _finish_commit()
+    flush_project_stats()
+
+
+# ---------- ID Sequences ----------
+
+_SEQUENCE_SOURCES = {
+    "account": (ACCOUNTS, "account_no"),
+    "transaction": (LEDGER, "transaction_no"),
+    "project": (PROJECT_DIS, "project_no"),
+    "seal": (SEALED_BLOCKS, "seal_no"),
+}
+
+
+def _highest_id(table: str, column: str) -> int:
+    numbers = [row[column][1:] for row in _backend().read_rows(table)]
+    return max((int(n) for n in numbers if n.isdigit()), default=0)
+
+
+def allocate_ids(sequence: str, count: int = 1) -> int:
+    """
+    Reserves count consecutive numbers of an ID sequence and returns the
+    first. The counter is seeded from the existing table on first use.
+    """
+    table, column = _SEQUENCE_SOURCES[sequence]
+    return _backend().allocate_sequence(
+        sequence, count, lambda: _highest_id(table, column)
+    )
 
 
 # ---------- Global Initializer ----------
 
 def init_all() -> None:
     """
-    Initialize all CSV files if they do not exist.
-    Must be called once at application startup.
+    Initialize all tables if they do not exist and redo any transaction
+    a crash left half-written. Must be called once at application startup.
     """
     init_accounts()
+    init_balance_journal()
     init_ledger()
     init_blockchain()
+    init_chain_checkpoints()
+    init_sealed_blocks()
     init_project_dis()
+    init_balance_history()
+    init_opening_balances()
+    with storage.file_lock(config.WRITER_LOCK):
+        recover_commit_log(rollback=True)
+    _backfill_balance_history()
+    _backfill_opening_balances()
+    init_project_stats()
+
+
+
+# ---------- Migration ----------
+
+def convert_money_to_fixed_point() -> int:
+    """
+    One-time rewrite of account balances into the canonical fixed-point
+    form ("87335783.0" -> "87335783.00"), folding in the balance journal.
+    Ledger amounts are left as stored: block hashes cover their text, and
+    money.to_paise() reads the old form exactly. Returns the number of
+    balances rewritten.
+    """
+    with _accounts_lock:
+        rows = read_accounts()
+        changed = 0
+        for row in rows:
+            balance = money.canonical(row["balance"])
+            if balance != row["balance"]:
+                row["balance"] = balance
+                changed += 1
+        _commit_snapshot(rows)
+        return changed
+
+
+def migrate_csv_to_sqlite() -> Dict[str, int]:
+    """
+    Imports the CSV tables into the SQLite database at config.SQLITE_DB.
+    Existing SQLite rows are replaced. Returns row counts per table.
+    """
+    source = storage.create_backend("csv", _table_specs())
+    target = storage.create_backend("sqlite", _table_specs())
 
+    source.recover_snapshot(ACCOUNTS, BALANCE_JOURNAL)
+    counts = {}
+    for table in _table_specs():
+        source.init_table(table)
+        target.init_table(table)
+        rows = source.read_rows(table)
+        target.write_rows(table, rows)
+        counts[table] = len(rows)
+    return counts
@@ -0,0 +1,135 @@
+# merkle.py
+# Append-only Merkle trees (RFC 6962 shape) for SHRDAA inclusion proofs
+
+import hashlib
+from typing import List
+
+
+# ---------- Hashing ----------
+
+# Same SHA-256-over-text scheme as coresystem's block hashes, with the
+# leaf / node prefixes keeping the two kinds of hash apart.
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+EMPTY_ROOT = _sha256("")
+
+
+def leaf_hash(data: str) -> str:
+    return _sha256("leaf|" + data)
+
+
+def node_hash(left: str, right: str) -> str:
+    return _sha256("node|" + left + right)
+
+
+def _split(size: int) -> int:
+    """Largest power of two below size (size >= 2)."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def merkle_root(leaves: List[str]) -> str:
+    """Root over a list of leaf hashes, without keeping a tree."""
+    if not leaves:
+        return EMPTY_ROOT
+    if len(leaves) == 1:
+        return leaves[0]
+    k = _split(len(leaves))
+    return node_hash(merkle_root(leaves[:k]), merkle_root(leaves[k:]))
+
+
+# ---------- Tree ----------
+
+class MerkleTree:
+    """
+    Append-only tree over leaf hashes. levels[k] holds, as raw 32-byte
+    digests, the root of every complete aligned subtree of 2**k leaves;
+    those never change once complete, so an append adds at most one node
+    per level and roots and proofs only hash along the right edge.
+    """
+
+    def __init__(self):
+        self.levels: List[bytearray] = [bytearray()]
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // 32
+
+    def _node(self, level: int, index: int) -> str:
+        return self.levels[level][index * 32:(index + 1) * 32].hex()
+
+    def append(self, leaf: str) -> None:
+        index = len(self)
+        self.levels[0] += bytes.fromhex(leaf)
+
+        level = 0
+        while index & 1:
+            combined = node_hash(self._node(level, index - 1), self._node(level, index))
+            if level + 1 == len(self.levels):
+                self.levels.append(bytearray())
+            self.levels[level + 1] += bytes.fromhex(combined)
+            index >>= 1
+            level += 1
+
+    def _subtree(self, start: int, size: int) -> str:
+        """Root of leaves [start, start + size)."""
+        if size & (size - 1) == 0 and start % size == 0:
+            return self._node(size.bit_length() - 1, start // size)
+        k = _split(size)
+        return node_hash(self._subtree(start, k), self._subtree(start + k, size - k))
+
+    def root(self, size: int = None) -> str:
+        size = len(self) if size is None else size
+        return self._subtree(0, size) if size else EMPTY_ROOT
+
+    def proof(self, index: int, size: int = None) -> List[str]:
+        """
+        Audit path for leaf index in the tree of the first size leaves,
+        sibling hashes ordered from the leaf up.
+        """
+        size = len(self) if size is None else size
+        if not 0 <= index < size <= len(self):
+            raise ValueError("Leaf index out of range")
+
+        path = []
+        start = 0
+        while size > 1:
+            k = _split(size)
+            if index < k:
+                path.append(self._subtree(start + k, size - k))
+                size = k
+            else:
+                path.append(self._subtree(start, k))
+                start += k
+                index -= k
+                size -= k
+        path.reverse()
+        return path
+
+
+# ---------- Verification ----------
+
+def verify_inclusion(leaf: str, index: int, size: int, path: List[str], root: str) -> bool:
+    """
+    Checks an audit path against a root in len(path) hashes
+    (RFC 9162, section 2.1.3.2).
+    """
+    if not 0 <= index < size:
+        return False
+
+    fn, sn = index, size - 1
+    r = leaf
+    for p in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
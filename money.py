@@ -0,0 +1,56 @@
+# money.py
+# Fixed-point money for SHRDAA: integer paise in code, "123.45" on disk
+
+import re
+from decimal import Decimal
+
+
+# Canonical stored form: optional minus, rupees, exactly two paise digits.
+_CANONICAL = re.compile(r"-?\d+\.\d\d")
+
+# Amounts must stay below 10**15 rupees, well inside a 64-bit paise count.
+MAX_RUPEE_DIGITS = 15
+_MAX_PAISE = 10 ** (MAX_RUPEE_DIGITS + 2)
+
+
+def _in_range(paise: int) -> int:
+    if abs(paise) >= _MAX_PAISE:
+        raise ValueError("Invalid amount")
+    return paise
+
+
+def to_paise(value) -> int:
+    """
+    Exact integer paise for an amount given as a string, int, Decimal or
+    float. Stored strings from before fixed-point ("87335783.0") parse
+    exactly too. Raises ValueError for anything finer than a paisa or
+    outside MAX_RUPEE_DIGITS.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _in_range(value * 100)
+    text = str(value).strip()
+    if _CANONICAL.fullmatch(text) and len(text) <= MAX_RUPEE_DIGITS + 4:
+        return _in_range(int(text.replace(".", "")))
+    try:
+        amount = Decimal(text)
+        # Checked before scaling: "1e999999999" would overflow, "1e5000"
+        # would build a huge integer and "1e-999999999" round to zero.
+        if not amount.is_finite() or (amount and not -2 <= amount.adjusted() < MAX_RUPEE_DIGITS):
+            raise ValueError("Invalid amount")
+        paise = amount.scaleb(2)
+        if paise != paise.to_integral_value():
+            raise ValueError("Invalid amount")
+    except ArithmeticError:  # decimal.InvalidOperation, Overflow, ...
+        raise ValueError("Invalid amount")
+    return _in_range(int(paise))
+
+
+def format_paise(paise: int) -> str:
+    """Canonical stored form of an amount, e.g. 1234567 -> "12345.67"."""
+    sign = "-" if paise < 0 else ""
+    rupees, rest = divmod(abs(paise), 100)
+    return f"{sign}{rupees}.{rest:02d}"
+
+
+def canonical(value) -> str:
+    return format_paise(to_paise(value))
@@ -0,0 +1,162 @@
+# records.py
+# Typed row records for SHRDAA tables
+
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+import money
+
+
+# ---------- Base Record ----------
+
+class Record:
+    """
+    A table row held in __slots__ instead of a dict. Values stay the stored
+    strings (block hashes are computed over them); repeated IDs are
+    interned so rows share one copy.
+
+    Mapping access (row["field"], get, keys, items, update, dict(row))
+    keeps dict-based callers, csv writers and templates working.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._KEYS = dict.fromkeys(cls.FIELDS).keys()
+
+    def __init__(self, **values: str):
+        for field in self.FIELDS:
+            self[field] = values.get(field, "")
+
+    @classmethod
+    def from_values(cls, values: List[str]) -> "Record":
+        """
+        Builds a record from one row's values in header order. Missing
+        trailing values are left empty. This is the hot path when loading
+        a table.
+        """
+        if len(values) < len(cls.FIELDS):
+            values = list(values) + [""] * (len(cls.FIELDS) - len(values))
+        record = object.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(record, field, sys.intern(value) if field in cls.INTERNED else value)
+        return record
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> "Record":
+        return cls(**row)
+
+    def to_row(self) -> Dict[str, str]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def copy(self) -> "Record":
+        return self.from_values([getattr(self, field) for field in self.FIELDS])
+
+    # --- dict compatibility ---
+
+    def __getitem__(self, field: str) -> str:
+        if field not in self._KEYS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field: str, value: str) -> None:
+        if field not in self._KEYS:
+            raise KeyError(field)
+        setattr(self, field, sys.intern(value) if field in self.INTERNED else value)
+
+    def __contains__(self, field: object) -> bool:
+        return field in self._KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_row() == other.to_row()
+        if isinstance(other, dict):
+            return self.to_row() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_row()!r})"
+
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in self._KEYS else default
+
+    def keys(self):
+        return self._KEYS
+
+    def values(self) -> List[str]:
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def update(self, changes: Dict[str, str]) -> None:
+        for field, value in changes.items():
+            self[field] = value
+
+
+# ---------- Table Records ----------
+
+class Account(Record):
+    __slots__ = (
+        "name",
+        "account_no",
+        "password_hash",
+        "balance",
+        "age",
+        "location",
+        "rank",
+        "authorised_projects_no",
+    )
+    FIELDS = __slots__
+    INTERNED = ("account_no", "rank", "location")
+
+    @property
+    def balance_paise(self) -> int:
+        return money.to_paise(self.balance)
+
+
+class LedgerEntry(Record):
+    __slots__ = (
+        "transaction_no",
+        "project_no",
+        "from_account_no",
+        "to_account_no",
+        "amount",
+        "timestamp",
+        "verification_status",
+    )
+    FIELDS = __slots__
+    INTERNED = ("project_no", "from_account_no", "to_account_no", "verification_status")
+
+    @property
+    def amount_paise(self) -> int:
+        return money.to_paise(self.amount)
+
+
+class Block(Record):
+    __slots__ = (
+        "transaction_no",
+        "project_no",
+        "previous_hash",
+        "current_hash",
+    )
+    FIELDS = __slots__
+    INTERNED = ("project_no",)
+
+
+class Project(Record):
+    __slots__ = (
+        "project_no",
+        "project_description",
+    )
+    FIELDS = __slots__
+    INTERNED = ("project_no",)
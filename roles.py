@@ -0,0 +1,53 @@
+# roles.py
+# Role resolution and account permissions for SHRDAA
+
+from functools import lru_cache
+from typing import Dict, FrozenSet, NamedTuple
+
+import config
+
+
+# ---------- Role Resolution ----------
+
+GOVT_KEYWORDS = (
+    "collector",
+    "secretary",
+    "joint secretary",
+    "commissioner",
+    "officer",
+)
+
+
+# Ranks repeat across accounts, so each distinct one is resolved once.
+@lru_cache(maxsize=1024)
+def resolve_user_role(rank: str) -> str:
+    r = rank.strip().lower()
+
+    if r == "auditor":
+        return config.ROLE_AUDITOR
+
+    for kw in GOVT_KEYWORDS:
+        if kw in r:
+            return config.ROLE_GOVT_OFFICER
+
+    return config.ROLE_BENEFICIARY
+
+
+# ---------- Account Permissions ----------
+
+class AccountPermissions(NamedTuple):
+    role: str
+    projects: FrozenSet[str]
+
+
+def parse_projects(authorised_projects_no: str) -> FrozenSet[str]:
+    if authorised_projects_no.strip() == "":
+        return frozenset()
+    return frozenset(authorised_projects_no.split(","))
+
+
+def permissions_of(account_row: Dict[str, str]) -> AccountPermissions:
+    return AccountPermissions(
+        role=resolve_user_role(account_row["rank"]),
+        projects=parse_projects(account_row["authorised_projects_no"]),
+    )
@@ -0,0 +1,1064 @@
+# storage.py
+# Storage engines behind the database.py API for SHRDAA
+
+import csv
+import io
+import os
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import dropwhile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: in-process locking only
+    fcntl = None
+
+
+# A stamp identifies the state of a table:
+#   (generation, version, end_position)
+# generation changes whenever the table is rewritten, version on any
+# write, and end_position marks the tail for read_rows_from().
+Stamp = Tuple[int, int, int]
+
+# Builds a row from one row's values in header order
+RowFactory = Callable[[List[str]], Dict[str, str]]
+
+# Table name -> (headers, indexed columns, row factory or None for dicts)
+TableSpecs = Dict[str, Tuple[List[str], List[str], Optional[RowFactory]]]
+
+
+def _dict_factory(headers: List[str]) -> RowFactory:
+    return lambda values: dict(zip(headers, values))
+
+
+def _first_true(low: int, high: int, test: Callable[[int], bool]) -> int:
+    """Smallest i in [low, high) for which test(i) holds, else high."""
+    while low < high:
+        middle = (low + high) // 2
+        if test(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class StorageBackend:
+    """
+    Interface implemented by every storage engine.
+    Tables are addressed by name; rows are Dict[str, str] keyed by headers,
+    or whatever dict-compatible record the table's row factory builds.
+    """
+
+    def __init__(self, tables: TableSpecs):
+        self.tables = tables
+        self.headers = {name: spec[0] for name, spec in tables.items()}
+        self.row_factories = {
+            name: spec[2] or _dict_factory(spec[0]) for name, spec in tables.items()
+        }
+
+    def init_table(self, table: str) -> None:
+        raise NotImplementedError
+
+    def read_rows(self, table: str) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def read_rows_from(self, table: str, position: int) -> Tuple[List[Dict[str, str]], int]:
+        """Rows written after position, and the position just past them."""
+        raise NotImplementedError
+
+    def iter_rows(self, table: str, start: int = 0) -> Iterator[Dict[str, str]]:
+        """Streams rows in insertion order, skipping the first start rows."""
+        raise NotImplementedError
+
+    def select_rows(self, table: str, column: str, value: str) -> List[Dict[str, str]]:
+        return list(self.iter_select(table, column, value))
+
+    def iter_select(self, table: str, column: str, value: str) -> Iterator[Dict[str, str]]:
+        """Streams rows whose column equals value, in insertion order."""
+        return (row for row in self.iter_rows(table) if row[column] == value)
+
+    def find_ordered(
+        self,
+        table: str,
+        column: str,
+        value: str,
+        key: Callable[[str], int],
+    ) -> Optional[Dict[str, str]]:
+        """
+        First row whose column equals value, in a table whose rows are in
+        ascending key(column) order, so engines may bisect to it.
+        """
+        return next(self.iter_select(table, column, value), None)
+
+    def iter_select_after(
+        self,
+        table: str,
+        column: str,
+        value: str,
+        after: Callable[[Dict[str, str]], bool],
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Like iter_select(), starting at the first row for which after(row)
+        holds. after must be false and then true along the table's order,
+        which lets engines bisect to the start instead of scanning to it.
+        """
+        return dropwhile(lambda row: not after(row), self.iter_select(table, column, value))
+
+    def append_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        raise NotImplementedError
+
+    def write_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        raise NotImplementedError
+
+    def replace_snapshot(self, table: str, rows: List[Dict[str, str]], cleared: str) -> None:
+        """Atomically replaces table with rows and empties the cleared table."""
+        raise NotImplementedError
+
+    def recover_snapshot(self, table: str, cleared: str) -> None:
+        """Completes a replace_snapshot() interrupted by a crash."""
+
+    def repair_tail(self, table: str) -> None:
+        """Drops a partially written last row left by a crash."""
+
+    def stamp(self, table: str) -> Optional[Stamp]:
+        raise NotImplementedError
+
+    def last_row(self, table: str) -> Optional[Dict[str, str]]:
+        """Most recently appended row, without reading the whole table."""
+        raise NotImplementedError
+
+    def last_rows(self, table: str, count: int) -> List[Dict[str, str]]:
+        """The last count rows in order, read from the end of the table."""
+        raise NotImplementedError
+
+    def modified_time(self, table: str) -> Optional[float]:
+        """Wall-clock time of the last write to a table, if known."""
+        raise NotImplementedError
+
+    def sync(self) -> None:
+        """Makes appends held back by the durability policy durable."""
+
+    def marks(self) -> Dict[str, List[int]]:
+        """
+        Where every table ends now, as [generation, end_position], for a
+        later rollback(). Taken right after sync().
+        """
+        raise NotImplementedError
+
+    def rollback(self, marks: Dict[str, List[int]]) -> List[str]:
+        """
+        Drops the rows appended after marks() was taken, in every table
+        not rewritten since. Returns the tables cut back.
+        """
+        raise NotImplementedError
+
+    def allocate_sequence(self, name: str, count: int, seed: Callable[[], int]) -> int:
+        """
+        Atomically reserves count consecutive values of a named sequence
+        and returns the first. seed() supplies the last used value the
+        first time a sequence is seen.
+        """
+        raise NotImplementedError
+
+
+# ---------- Locking ----------
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive lock across threads (threading.Lock) and processes (flock).
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+
+    with thread_lock:
+        with open(path, mode="a") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ---------- Durability ----------
+
+DURABILITY_NONE = "none"
+DURABILITY_GROUP = "group"
+DURABILITY_ALWAYS = "always"
+
+_unsynced: set = set()
+_unsynced_lock = threading.Lock()
+
+
+def mark_unsynced(path: str) -> None:
+    """Marks a file written without fsync for the next sync_appended()."""
+    with _unsynced_lock:
+        _unsynced.add(path)
+
+
+def appended(path: str, f) -> None:
+    """
+    Called after each append to an open file: fsyncs it now ("always"),
+    or marks it for the next sync_appended() ("group").
+    """
+    if config.WRITE_DURABILITY == DURABILITY_NONE:
+        return
+    f.flush()
+    if config.WRITE_DURABILITY == DURABILITY_ALWAYS:
+        os.fsync(f.fileno())
+        return
+    mark_unsynced(path)
+
+
+def sync_appended() -> None:
+    """
+    One fsync per file appended to since the last call.
+    """
+    with _unsynced_lock:
+        paths = list(_unsynced)
+        _unsynced.clear()
+
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+# ---------- CSV Engine ----------
+
+SEQUENCE_HEADERS = ["name", "value"]
+
+def ensure_csv(path: str, headers: List[str]) -> None:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writeheader()
+
+
+def read_csv(path: str) -> List[Dict[str, str]]:
+    with open(path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return list(reader)
+
+
+def write_csv(
+    path: str,
+    rows: List[Dict[str, str]],
+    headers: List[str],
+    durable: bool = True,
+) -> None:
+    # Write to a temporary file and swap it in, so a crash mid-write
+    # never leaves a truncated table behind.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def append_csv(
+    path: str,
+    rows: List[Dict[str, str]],
+    headers: List[str],
+    durable: bool = True,
+) -> None:
+    with open(path, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writerows(rows)
+        if durable:
+            appended(path, f)
+
+
+def truncate_torn_tail(path: str) -> None:
+    """
+    Drops a partially written last line left behind by a crash mid-append,
+    so the next append starts on a fresh line.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, mode="rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            cut = chunk.rfind(b"\n")
+            if cut != -1:
+                f.truncate(pos + cut + 1)
+                return
+        f.truncate(0)
+
+
+def skip_lines(f, count: int) -> int:
+    """
+    Advances a binary file past count lines without parsing them and
+    returns the new offset. Used for tables with one row per line.
+    """
+    offset = f.tell()
+    while count > 0:
+        chunk = f.read(1 << 20)
+        if not chunk:
+            break
+        pos = -1
+        while count > 0:
+            pos = chunk.find(b"\n", pos + 1)
+            if pos == -1:
+                break
+            count -= 1
+        if count == 0:
+            offset += pos + 1
+            break
+        offset += len(chunk)
+    f.seek(offset)
+    return offset
+
+
+def read_last_line(path: str) -> Optional[Tuple[str, int]]:
+    """
+    Returns the last complete line of a file and its byte offset by
+    seeking backwards from the end, or None if the file is empty.
+    """
+    with open(path, mode="rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        buf = b""
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+            last_nl = buf.rfind(b"\n")
+            if last_nl == -1:
+                continue
+            start = buf.rfind(b"\n", 0, last_nl)
+            if start != -1 or pos == 0:
+                line = buf[start + 1:last_nl + 1]
+                return line.decode("utf-8"), pos + start + 1
+    return None
+
+
+def read_last_lines(path: str, count: int) -> List[str]:
+    """
+    Returns up to count complete lines from the end of a file, excluding
+    the header line, by seeking backwards from the end.
+    """
+    if count <= 0:
+        return []
+    with open(path, mode="rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        buf = b""
+        pos = end
+        while pos > 0 and buf.count(b"\n") <= count:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    buf = buf[:buf.rfind(b"\n") + 1]  # drop a torn trailing line
+    lines = buf.decode("utf-8").splitlines()
+    if pos == 0:
+        lines = lines[1:]  # header
+    return lines[-count:]
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def encode_csv_rows(rows: List[Dict[str, str]], headers: List[str]) -> List[bytes]:
+    """Serialises rows exactly as csv.DictWriter would, one bytes line each."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    lines = []
+    for row in rows:
+        writer.writerow([row.get(h, "") for h in headers])
+        lines.append(buf.getvalue().encode("utf-8"))
+        buf.seek(0)
+        buf.truncate()
+    return lines
+
+
+class CsvOffsetIndex:
+    """
+    Persistent secondary index from a column value to the byte ranges of
+    matching rows in a CSV table, so a lookup reads only those rows.
+
+    The sidecar is append-only (key, offset, end) rows. Its first row,
+    with an empty key, records the inode of the table it was built for.
+    Every row's range is also kept in table order, for bisecting ordered
+    tables.
+    Rows appended by other processes are indexed by catching up from the
+    last covered offset; a rewritten table triggers a rebuild.
+    """
+
+    HEADERS = ["key", "offset", "end"]
+
+    def __init__(self, table_path: str, index_path: str, position: int):
+        self.table_path = table_path
+        self.index_path = index_path
+        self.position = position  # column position within a row
+        self.entries: Dict[str, List[Tuple[int, int]]] = {}
+        self.starts = array("q")
+        self.ends = array("q")
+        self.inode: Optional[int] = None
+        self.covered = 0
+        self.stamp: Optional[Stamp] = None
+        self.lock = threading.RLock()
+
+    def _clear(self) -> None:
+        self.entries = {}
+        self.starts = array("q")
+        self.ends = array("q")
+        self.inode = None
+        self.covered = 0
+
+    def _load(self) -> None:
+        self._clear()
+        if not os.path.exists(self.index_path):
+            return
+        found = []
+        for row in read_csv(self.index_path):
+            if row["key"] == "":
+                self.inode = int(row["offset"])
+                continue
+            found.append((row["key"], int(row["offset"]), int(row["end"])))
+        self._add(found)
+
+    def _scan(self, start: int) -> List[Tuple[str, int, int]]:
+        found = []
+        with open(self.table_path, mode="rb") as f:
+            f.seek(start)
+            if start == 0:
+                f.readline()  # header
+            offset = f.tell()
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn tail, indexed once complete
+                end = offset + len(line)
+                values = next(csv.reader([line.decode("utf-8")]))
+                if len(values) > self.position:
+                    found.append((values[self.position], offset, end))
+                offset = end
+        return found
+
+    def _add(self, found: List[Tuple[str, int, int]]) -> None:
+        for key, offset, end in found:
+            if offset < self.covered:
+                continue  # also indexed by another process
+            self.entries.setdefault(key, []).append((offset, end))
+            self.starts.append(offset)
+            self.ends.append(end)
+            self.covered = end
+
+    def _rebuild(self, found: List[Tuple[str, int, int]], inode: int) -> None:
+        self._clear()
+        self.inode = inode
+        self._add(found)
+        rows = [{"key": "", "offset": str(inode), "end": ""}]
+        rows += [{"key": k, "offset": str(o), "end": str(e)} for k, o, e in found]
+        write_csv(self.index_path, rows, self.HEADERS, durable=False)
+
+    def _persist(self, found: List[Tuple[str, int, int]]) -> None:
+        append_csv(
+            self.index_path,
+            [{"key": k, "offset": str(o), "end": str(e)} for k, o, e in found],
+            self.HEADERS,
+            durable=False,  # rebuilt from the table if lost
+        )
+
+    def refresh(self) -> None:
+        with self.lock:
+            stamp = file_stamp(self.table_path)
+            if stamp is None or stamp == self.stamp:
+                return
+            if self.stamp is None:
+                self._load()
+
+            if self.inode != stamp[0] or self.covered > stamp[2]:
+                self._rebuild(self._scan(0), stamp[0])
+            elif self.covered < stamp[2]:
+                found = self._scan(self.covered)
+                self._add(found)
+                self._persist(found)
+            self.stamp = stamp
+
+    def lookup(self, key: str) -> List[Tuple[int, int]]:
+        self.refresh()
+        with self.lock:
+            return list(self.entries.get(key, []))
+
+    def ranges(self) -> Tuple[array, array]:
+        """Start and end offsets of every row, in table order."""
+        self.refresh()
+        with self.lock:
+            return array("q", self.starts), array("q", self.ends)
+
+    def appended(self, keys: List[str], start: int, lines: List[bytes]) -> None:
+        """Records rows just appended at byte offset start."""
+        with self.lock:
+            found = []
+            offset = start
+            for key, line in zip(keys, lines):
+                found.append((key, offset, offset + len(line)))
+                offset += len(line)
+            self._add(found)
+            self._persist(found)
+            self.stamp = file_stamp(self.table_path)
+
+    def rewritten(self, keys: List[str], header_size: int, lines: List[bytes]) -> None:
+        """Rebuilds the index for a table just rewritten from lines."""
+        with self.lock:
+            found = []
+            offset = header_size
+            for key, line in zip(keys, lines):
+                found.append((key, offset, offset + len(line)))
+                offset += len(line)
+            stamp = file_stamp(self.table_path)
+            self._rebuild(found, stamp[0])
+            self.stamp = stamp
+
+
+class CsvBackend(StorageBackend):
+    """One CSV file per table, as laid out in config.py."""
+
+    COMPACT_SUFFIX = ".compact"
+
+    def __init__(
+        self,
+        tables: TableSpecs,
+        paths: Dict[str, str],
+        sequences_path: str,
+        offset_indexes: Dict[str, Tuple[str, str]],
+    ):
+        super().__init__(tables)
+        self.paths = paths
+        self.sequences_path = sequences_path
+
+        # table -> (column, CsvOffsetIndex) for tables with a persistent index
+        self.offset_indexes: Dict[str, Tuple[str, CsvOffsetIndex]] = {}
+        for table, (column, index_path) in offset_indexes.items():
+            position = self.headers[table].index(column)
+            index = CsvOffsetIndex(paths[table], index_path, position)
+            self.offset_indexes[table] = (column, index)
+
+    def init_table(self, table: str) -> None:
+        ensure_csv(self.paths[table], self.headers[table])
+
+    def read_rows(self, table: str) -> List[Dict[str, str]]:
+        with open(self.paths[table], mode="r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            return list(map(self.row_factories[table], reader))
+
+    def iter_rows(self, table: str, start: int = 0) -> Iterator[Dict[str, str]]:
+        path = self.paths[table]
+        with open(path, mode="rb") as f:
+            offset = skip_lines(f, start + 1)  # header + skipped rows
+
+        with open(path, mode="r", newline="", encoding="utf-8") as f:
+            f.seek(offset)
+            yield from map(self.row_factories[table], csv.reader(f))
+
+    def read_rows_from(self, table: str, position: int) -> Tuple[List[Dict[str, str]], int]:
+        with open(self.paths[table], mode="rb") as f:
+            f.seek(position)
+            data = f.read()
+
+        # Only complete lines; a torn trailing line is picked up later.
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].decode("utf-8").splitlines()
+        if position == 0:
+            lines = lines[1:]
+
+        width = len(self.headers[table])
+        make_row = self.row_factories[table]
+        rows = [make_row(values) for values in csv.reader(lines) if len(values) == width]
+        return rows, position + end
+
+    def iter_select(self, table: str, column: str, value: str) -> Iterator[Dict[str, str]]:
+        indexed = self.offset_indexes.get(table)
+        if indexed is None or indexed[0] != column:
+            yield from super().iter_select(table, column, value)
+            return
+
+        make_row = self.row_factories[table]
+        with open(self.paths[table], mode="rb") as f:
+            for offset, end in indexed[1].lookup(value):
+                f.seek(offset)
+                values = next(csv.reader([f.read(end - offset).decode("utf-8")]))
+                yield make_row(values)
+
+    def find_ordered(
+        self,
+        table: str,
+        column: str,
+        value: str,
+        key: Callable[[str], int],
+    ) -> Optional[Dict[str, str]]:
+        # Any offset index on the table lists every row's byte range.
+        indexed = self.offset_indexes.get(table)
+        if indexed is None:
+            return super().find_ordered(table, column, value, key)
+
+        make_row = self.row_factories[table]
+        starts, ends = indexed[1].ranges()
+        target = key(value)
+        with open(self.paths[table], mode="rb") as f:
+            def read(i: int) -> Dict[str, str]:
+                f.seek(starts[i])
+                return make_row(next(csv.reader([f.read(ends[i] - starts[i]).decode("utf-8")])))
+
+            i = _first_true(0, len(starts), lambda i: key(read(i)[column]) >= target)
+            while i < len(starts):
+                row = read(i)
+                if row[column] == value:
+                    return row
+                if key(row[column]) != target:
+                    return None
+                i += 1
+        return None
+
+    def iter_select_after(
+        self,
+        table: str,
+        column: str,
+        value: str,
+        after: Callable[[Dict[str, str]], bool],
+    ) -> Iterator[Dict[str, str]]:
+        indexed = self.offset_indexes.get(table)
+        if indexed is None or indexed[0] != column:
+            yield from super().iter_select_after(table, column, value, after)
+            return
+
+        make_row = self.row_factories[table]
+        with open(self.paths[table], mode="rb") as f:
+            def read(offset: int, end: int) -> Dict[str, str]:
+                f.seek(offset)
+                return make_row(next(csv.reader([f.read(end - offset).decode("utf-8")])))
+
+            ranges = indexed[1].lookup(value)
+            start = _first_true(0, len(ranges), lambda i: after(read(*ranges[i])))
+            for offset, end in ranges[start:]:
+                yield read(offset, end)
+
+    def append_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        indexed = self.offset_indexes.get(table)
+        if indexed is None:
+            append_csv(self.paths[table], rows, self.headers[table])
+            return
+
+        column, index = indexed
+        index.refresh()
+        lines = encode_csv_rows(rows, self.headers[table])
+        with open(self.paths[table], mode="ab") as f:
+            start = f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+            appended(self.paths[table], f)
+        index.appended([row[column] for row in rows], start, lines)
+
+    def write_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        indexed = self.offset_indexes.get(table)
+        if indexed is None:
+            write_csv(self.paths[table], rows, self.headers[table])
+            return
+
+        column, index = indexed
+        headers = self.headers[table]
+        header_line = encode_csv_rows([dict(zip(headers, headers))], headers)[0]
+        lines = encode_csv_rows(rows, headers)
+
+        path = self.paths[table]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, mode="wb") as f:
+            f.write(header_line)
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        index.rewritten([row[column] for row in rows], len(header_line), lines)
+
+    def replace_snapshot(self, table: str, rows: List[Dict[str, str]], cleared: str) -> None:
+        # The .compact file is only renamed into place once fully written,
+        # so its presence marks a snapshot that supersedes the cleared table.
+        write_csv(self.paths[table] + self.COMPACT_SUFFIX, rows, self.headers[table])
+        self.recover_snapshot(table, cleared)
+
+    def recover_snapshot(self, table: str, cleared: str) -> None:
+        compact_path = self.paths[table] + self.COMPACT_SUFFIX
+        if not os.path.exists(compact_path):
+            return
+        write_csv(self.paths[cleared], [], self.headers[cleared])
+        os.replace(compact_path, self.paths[table])
+
+    def repair_tail(self, table: str) -> None:
+        truncate_torn_tail(self.paths[table])
+        ensure_csv(self.paths[table], self.headers[table])
+
+    def stamp(self, table: str) -> Optional[Stamp]:
+        return file_stamp(self.paths[table])
+
+    def modified_time(self, table: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.paths[table])
+        except FileNotFoundError:
+            return None
+
+    def last_row(self, table: str) -> Optional[Dict[str, str]]:
+        found = read_last_line(self.paths[table])
+        if found is None or found[1] == 0:  # empty, or only the header
+            return None
+        values = next(csv.reader([found[0]]))
+        return self.row_factories[table](values)
+
+    def last_rows(self, table: str, count: int) -> List[Dict[str, str]]:
+        lines = read_last_lines(self.paths[table], count)
+        return list(map(self.row_factories[table], csv.reader(lines)))
+
+    def sync(self) -> None:
+        sync_appended()
+
+    def marks(self) -> Dict[str, List[int]]:
+        found = {}
+        for table, path in self.paths.items():
+            stamp = file_stamp(path)
+            if stamp is not None:
+                found[table] = [stamp[0], stamp[2]]
+        return found
+
+    def rollback(self, marks: Dict[str, List[int]]) -> List[str]:
+        cut = []
+        for table, (inode, size) in marks.items():
+            stamp = file_stamp(self.paths[table]) if table in self.paths else None
+            if stamp is None or stamp[0] != inode or stamp[2] <= size:
+                continue
+            with open(self.paths[table], mode="r+b") as f:
+                f.truncate(size)
+                os.fsync(f.fileno())
+            cut.append(table)
+        return cut
+
+    def allocate_sequence(self, name: str, count: int, seed: Callable[[], int]) -> int:
+        with file_lock(self.sequences_path + ".lock"):
+            values = {}
+            if os.path.exists(self.sequences_path):
+                values = {
+                    row["name"]: int(row["value"])
+                    for row in read_csv(self.sequences_path)
+                }
+
+            current = values[name] if name in values else seed()
+            values[name] = current + count
+
+            # The counter only needs to be durable along with the rows
+            # using its IDs: under "group" that is the next sync().
+            write_csv(
+                self.sequences_path,
+                [{"name": n, "value": str(v)} for n, v in values.items()],
+                SEQUENCE_HEADERS,
+                durable=config.WRITE_DURABILITY == DURABILITY_ALWAYS,
+            )
+            if config.WRITE_DURABILITY == DURABILITY_GROUP:
+                mark_unsynced(self.sequences_path)
+        return current + 1
+
+
+# ---------- SQLite Engine ----------
+
+class SqliteBackend(StorageBackend):
+    """
+    All tables in one SQLite database in WAL mode. Each table keeps an
+    AUTOINCREMENT _seq column for insertion order and read_rows_from().
+    """
+
+    # Durability policy -> PRAGMA synchronous. In WAL mode NORMAL skips
+    # the fsync on commit and syncs at checkpoints instead.
+    SYNCHRONOUS = {
+        DURABILITY_NONE: "OFF",
+        DURABILITY_GROUP: "NORMAL",
+        DURABILITY_ALWAYS: "FULL",
+    }
+
+    def __init__(self, tables: TableSpecs, path: str):
+        super().__init__(tables)
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[config.WRITE_DURABILITY]}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _table_versions ("
+                "name TEXT PRIMARY KEY, generation INTEGER, version INTEGER)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _sequences ("
+                "name TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _bump(self, conn: sqlite3.Connection, table: str, rewrite: bool) -> None:
+        conn.execute(
+            "UPDATE _table_versions SET version = version + 1, "
+            "generation = generation + ? WHERE name = ?",
+            (1 if rewrite else 0, table),
+        )
+
+    def _columns(self, table: str) -> str:
+        return ", ".join(f'"{h}"' for h in self.headers[table])
+
+    def _insert(self, conn: sqlite3.Connection, table: str, rows: List[Dict[str, str]]) -> None:
+        headers = self.headers[table]
+        placeholders = ", ".join("?" for _ in headers)
+        conn.executemany(
+            f'INSERT INTO "{table}" ({self._columns(table)}) VALUES ({placeholders})',
+            [tuple(row.get(h, "") for h in headers) for row in rows],
+        )
+
+    def _select(self, table: str, where: str = "", params: tuple = ()) -> List[Dict[str, str]]:
+        cursor = self._conn().execute(
+            f'SELECT {self._columns(table)} FROM "{table}" {where} ORDER BY _seq',
+            params,
+        )
+        return list(map(self.row_factories[table], cursor))
+
+    def init_table(self, table: str) -> None:
+        headers, indexes, _ = self.tables[table]
+        columns = ", ".join(f'"{h}" TEXT' for h in headers)
+        with self._transaction() as conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" '
+                f"(_seq INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+            )
+            for column in indexes:
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{table}_{column}" '
+                    f'ON "{table}" ("{column}")'
+                )
+            conn.execute(
+                "INSERT OR IGNORE INTO _table_versions VALUES (?, 0, 0)",
+                (table,),
+            )
+
+    def read_rows(self, table: str) -> List[Dict[str, str]]:
+        return self._select(table)
+
+    def iter_rows(self, table: str, start: int = 0) -> Iterator[Dict[str, str]]:
+        cursor = self._conn().execute(
+            f'SELECT {self._columns(table)} FROM "{table}" '
+            f"ORDER BY _seq LIMIT -1 OFFSET ?",
+            (start,),
+        )
+        yield from map(self.row_factories[table], cursor)
+
+    def read_rows_from(self, table: str, position: int) -> Tuple[List[Dict[str, str]], int]:
+        conn = self._conn()
+        end = conn.execute(f'SELECT COALESCE(MAX(_seq), 0) FROM "{table}"').fetchone()[0]
+        rows = self._select(table, "WHERE _seq > ? AND _seq <= ?", (position, end))
+        return rows, max(position, end)
+
+    def select_rows(self, table: str, column: str, value: str) -> List[Dict[str, str]]:
+        return self._select(table, f'WHERE "{column}" = ?', (value,))
+
+    def iter_select(self, table: str, column: str, value: str) -> Iterator[Dict[str, str]]:
+        cursor = self._conn().execute(
+            f'SELECT {self._columns(table)} FROM "{table}" '
+            f'WHERE "{column}" = ? ORDER BY _seq',
+            (value,),
+        )
+        yield from map(self.row_factories[table], cursor)
+
+    def iter_select_after(
+        self,
+        table: str,
+        column: str,
+        value: str,
+        after: Callable[[Dict[str, str]], bool],
+    ) -> Iterator[Dict[str, str]]:
+        conn = self._conn()
+        make_row = self.row_factories[table]
+        where = f'WHERE "{column}" = ? AND _seq >= ? ORDER BY _seq'
+        low, high = conn.execute(
+            f'SELECT MIN(_seq), MAX(_seq) FROM "{table}" WHERE "{column}" = ?',
+            (value,),
+        ).fetchone()
+        if low is None:
+            return
+
+        def first_from(seq: int) -> Dict[str, str]:
+            found = conn.execute(
+                f'SELECT {self._columns(table)} FROM "{table}" {where} LIMIT 1',
+                (value, seq),
+            ).fetchone()
+            return make_row(found)
+
+        start = _first_true(low, high + 1, lambda seq: after(first_from(seq)))
+        cursor = conn.execute(
+            f'SELECT {self._columns(table)} FROM "{table}" {where}',
+            (value, start),
+        )
+        yield from map(make_row, cursor)
+
+    def append_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        with self._transaction() as conn:
+            self._insert(conn, table, rows)
+            self._bump(conn, table, rewrite=False)
+
+    def write_rows(self, table: str, rows: List[Dict[str, str]]) -> None:
+        with self._transaction() as conn:
+            conn.execute(f'DELETE FROM "{table}"')
+            self._insert(conn, table, rows)
+            self._bump(conn, table, rewrite=True)
+
+    def replace_snapshot(self, table: str, rows: List[Dict[str, str]], cleared: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(f'DELETE FROM "{table}"')
+            self._insert(conn, table, rows)
+            conn.execute(f'DELETE FROM "{cleared}"')
+            self._bump(conn, table, rewrite=True)
+            self._bump(conn, cleared, rewrite=True)
+
+    def stamp(self, table: str) -> Optional[Stamp]:
+        conn = self._conn()
+        found = conn.execute(
+            "SELECT generation, version FROM _table_versions WHERE name = ?",
+            (table,),
+        ).fetchone()
+        if found is None:
+            return None
+        end = conn.execute(f'SELECT COALESCE(MAX(_seq), 0) FROM "{table}"').fetchone()[0]
+        return (found[0], found[1], end)
+
+    def modified_time(self, table: str) -> Optional[float]:
+        # Per-table times are not tracked; use the database files.
+        times = [
+            os.path.getmtime(path)
+            for path in (self.path, self.path + "-wal")
+            if os.path.exists(path)
+        ]
+        return max(times) if times else None
+
+    def sync(self) -> None:
+        # Commits under synchronous=NORMAL are durable once the WAL is
+        # synced, which a passive checkpoint does.
+        if config.WRITE_DURABILITY == DURABILITY_GROUP:
+            self._conn().execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def marks(self) -> Dict[str, List[int]]:
+        found = {}
+        for table in self.tables:
+            stamp = self.stamp(table)
+            if stamp is not None:
+                found[table] = [stamp[0], stamp[2]]
+        return found
+
+    def rollback(self, marks: Dict[str, List[int]]) -> List[str]:
+        cut = []
+        with self._transaction() as conn:
+            for table, (generation, end) in marks.items():
+                stamp = self.stamp(table) if table in self.tables else None
+                if stamp is None or stamp[0] != generation or stamp[2] <= end:
+                    continue
+                conn.execute(f'DELETE FROM "{table}" WHERE _seq > ?', (end,))
+                self._bump(conn, table, rewrite=True)
+                cut.append(table)
+        return cut
+
+    def last_row(self, table: str) -> Optional[Dict[str, str]]:
+        rows = self._select(table, f'WHERE _seq = (SELECT MAX(_seq) FROM "{table}")')
+        return rows[0] if rows else None
+
+    def last_rows(self, table: str, count: int) -> List[Dict[str, str]]:
+        return self._select(
+            table,
+            f'WHERE _seq IN (SELECT _seq FROM "{table}" ORDER BY _seq DESC LIMIT ?)',
+            (count,),
+        )
+
+    def allocate_sequence(self, name: str, count: int, seed: Callable[[], int]) -> int:
+        with self._transaction() as conn:
+            found = conn.execute(
+                "SELECT value FROM _sequences WHERE name = ?", (name,)
+            ).fetchone()
+            current = found[0] if found else seed()
+            conn.execute(
+                "INSERT OR REPLACE INTO _sequences VALUES (?, ?)",
+                (name, current + count),
+            )
+        return current + 1
+
+
+# ---------- Engine Selection ----------
+
+def csv_table_paths() -> Dict[str, str]:
+    return {
+        "accounts": config.ACCOUNTS_CSV,
+        "balance_journal": config.BALANCE_JOURNAL_CSV,
+        "password_upgrades": config.PASSWORD_UPGRADES_CSV,
+        "ledger": config.LEDGER_CSV,
+        "blockchain": config.BLOCKCHAIN_CSV,
+        "project_dis": config.PROJECT_DIS_CSV,
+        "chain_checkpoints": config.CHAIN_CHECKPOINTS_CSV,
+        "sealed_blocks": config.SEALED_BLOCKS_CSV,
+        "balance_history": config.BALANCE_HISTORY_CSV,
+        "opening_balances": config.OPENING_BALANCES_CSV,
+    }
+
+
+def create_backend(name: str, tables: TableSpecs) -> StorageBackend:
+    if name == "csv":
+        return CsvBackend(
+            tables,
+            csv_table_paths(),
+            config.SEQUENCES_CSV,
+            {
+                "ledger": ("project_no", config.LEDGER_PROJECT_INDEX_CSV),
+                "balance_history": ("account_no", config.BALANCE_HISTORY_INDEX_CSV),
+            },
+        )
+    if name == "sqlite":
+        return SqliteBackend(tables, config.SQLITE_DB)
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -0,0 +1,115 @@
+# writer.py
+# Single-writer queue for SHRDAA mutations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+from typing import Callable, List, Optional, Tuple
+
+import config
+import database
+import storage
+
+
+# ---------- Writer Thread ----------
+
+Job = Tuple[Callable, tuple, dict, Future]
+
+_jobs: "queue.Queue[Job]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_worker_guard = threading.Lock()
+
+
+def _run(job: Job) -> Tuple[bool, object]:
+    func, args, kwargs, _ = job
+    try:
+        return True, func(*args, **kwargs)
+    except BaseException as e:
+        return False, e
+
+
+def _collect(first: Job) -> List[Job]:
+    """
+    Gathers the writes queued behind first, waiting up to
+    config.WRITE_GROUP_WINDOW for stragglers when appends are fsynced
+    per group.
+    """
+    jobs = [first]
+    window = config.WRITE_GROUP_WINDOW
+    if config.WRITE_DURABILITY != storage.DURABILITY_GROUP:
+        window = 0
+    deadline = time.monotonic() + window
+
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                jobs.append(_jobs.get(timeout=remaining))
+            else:
+                jobs.append(_jobs.get_nowait())
+        except queue.Empty:
+            return jobs
+
+
+def _work() -> None:
+    """
+    Runs queued writes as groups: each group runs one job at a time
+    under a single acquisition of the cross-process lock, then is made
+    durable with one commit_group() before any caller is answered.
+    """
+    while True:
+        jobs = [job for job in _collect(_jobs.get()) if job[3].set_running_or_notify_cancel()]
+        try:
+            with storage.file_lock(config.WRITER_LOCK):
+                outcomes = [_run(job) for job in jobs]
+                database.commit_group()
+        except BaseException as e:
+            # Lock or fsync failed: nothing in the group is known durable.
+            outcomes = [(False, e)] * len(jobs)
+
+        for (_, _, _, future), (ok, value) in zip(jobs, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+def _ensure_worker() -> None:
+    global _worker
+
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_guard:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="shrdaa-writer", daemon=True)
+            _worker.start()
+
+
+def in_writer() -> bool:
+    return threading.current_thread() is _worker
+
+
+def submit(func: Callable, *args, **kwargs):
+    """
+    Runs func on the writer thread and returns its result (or raises its
+    exception). Calls made from the writer thread itself run inline.
+    """
+    if in_writer():
+        return func(*args, **kwargs)
+
+    _ensure_worker()
+    future = Future()
+    _jobs.put((func, args, kwargs, future))
+    return future.result()
+
+
+def serialized(func: Callable) -> Callable:
+    """
+    Decorator: every call to func goes through the single writer.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return submit(func, *args, **kwargs)
+    return wrapper